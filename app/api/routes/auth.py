@@ -1,10 +1,23 @@
 from fastapi import APIRouter, HTTPException, Depends, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from passlib.context import CryptContext
-from jose import JWTError, jwt
+from cachetools import TTLCache
+from argon2 import PasswordHasher, Type
+from argon2.exceptions import InvalidHashError, VerificationError
+import bcrypt
+import jwt
+import orjson
+import pybase64
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Optional, Tuple
+from concurrent.futures import ProcessPoolExecutor
+import asyncio
+import hashlib
+import hmac
 import logging
+import os
+import time
 
 from app.models.user import UserCreate, UserInDB, User, UserUpdate
 from app.core.config import settings
@@ -12,16 +25,70 @@ from app.core.database import MongoDB
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
+
+# Never load password hashes where only the public profile is needed
+USER_PROJECTION = {"hashed_password": 0}
 security = HTTPBearer()
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+# New hashes use argon2id; legacy bcrypt hashes still verify and are upgraded on login
+_argon2 = PasswordHasher(
+    time_cost=settings.argon2_time_cost,
+    memory_cost=settings.argon2_memory_cost,
+    parallelism=settings.argon2_parallelism,
+    type=Type.ID,
+)
+
+# Verified in place of a real hash when the login user doesn't exist
+_DUMMY_HASH = _argon2.hash("dummy-password")
+
+# Authenticated users keyed by raw bearer token -> (User, token expiry timestamp)
+_user_cache = TTLCache(maxsize=8192, ttl=30)
+
+# HMAC key for HS256 tokens, encoded once instead of per request
+_token_key = settings.secret_key.encode()
+
+# Password hashing is pure CPU; run it in worker processes so it never blocks the event loop
+_password_pool = ProcessPoolExecutor(max_workers=os.cpu_count())
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verify a password against its hash"""
-    return pwd_context.verify(plain_password, hashed_password)
+    if hashed_password.startswith("$2"):
+        return bcrypt.checkpw(plain_password.encode(), hashed_password.encode())
+    try:
+        return _argon2.verify(hashed_password, plain_password)
+    except (VerificationError, InvalidHashError):
+        return False
+
+def verify_and_update_password(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """Verify a password and return a replacement hash if the stored one is outdated"""
+    if not verify_password(plain_password, hashed_password):
+        return False, None
+    if hashed_password.startswith("$2") or _argon2.check_needs_rehash(hashed_password):
+        return True, get_password_hash(plain_password)
+    return True, None
 
 def get_password_hash(password: str) -> str:
     """Hash a password"""
-    return pwd_context.hash(password)
+    return _argon2.hash(password)
+
+async def run_password_task(func, *args):
+    """Run a password hashing function in the process pool"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_password_pool, func, *args)
+
+async def warm_password_pool():
+    """Start the hashing workers ahead of the first login"""
+    await run_password_task(get_password_hash, "warmup-password")
+
+def shutdown_password_pool():
+    """Stop the hashing workers"""
+    _password_pool.shutdown(wait=False, cancel_futures=True)
+
+def invalidate_cached_user(user_id: str):
+    """Drop every cached token entry that resolves to the given user"""
+    for token, (user, _) in list(_user_cache.items()):
+        if user.id == user_id:
+            _user_cache.pop(token, None)
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     """Create a JWT access token"""
@@ -34,6 +101,31 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, settings.secret_key, algorithm="HS256")
     return encoded_jwt
 
+def _b64url_decode(segment: str) -> bytes:
+    """Decode an unpadded base64url JWT segment"""
+    return pybase64.urlsafe_b64decode(segment + "=" * (-len(segment) % 4))
+
+def _verify_token(token: str) -> Optional[dict]:
+    """Verify an HS256 token's signature and expiry and return its claims"""
+    try:
+        header_b64, payload_b64, signature_b64 = token.split(".")
+        header = orjson.loads(_b64url_decode(header_b64))
+        if header.get("alg") != "HS256":
+            return None
+        expected = hmac.new(
+            _token_key, f"{header_b64}.{payload_b64}".encode(), hashlib.sha256
+        ).digest()
+        if not hmac.compare_digest(expected, _b64url_decode(signature_b64)):
+            return None
+        payload = orjson.loads(_b64url_decode(payload_b64))
+    except (ValueError, TypeError, AttributeError):
+        return None
+    
+    exp = payload.get("exp")
+    if not isinstance(exp, (int, float)) or exp <= time.time():
+        return None
+    return payload
+
 async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)) -> User:
     """Get the current authenticated user"""
     credentials_exception = HTTPException(
@@ -42,20 +134,24 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
         headers={"WWW-Authenticate": "Bearer"},
     )
     
-    try:
-        payload = jwt.decode(credentials.credentials, settings.secret_key, algorithms=["HS256"])
-        user_id: str = payload.get("sub")
-        if user_id is None:
-            raise credentials_exception
-    except JWTError:
+    token = credentials.credentials
+    cached = _user_cache.get(token)
+    if cached and cached[1] > time.time():
+        return cached[0]
+    
+    payload = _verify_token(token)
+    if payload is None:
+        raise credentials_exception
+    user_id: str = payload.get("sub")
+    if user_id is None:
         raise credentials_exception
     
     collection = MongoDB.get_collection("users")
-    user_doc = await collection.find_one({"_id": user_id})
+    user_doc = await collection.find_one({"_id": user_id}, USER_PROJECTION)
     if user_doc is None:
         raise credentials_exception
     
-    return User(
+    user = User(
         id=str(user_doc["_id"]),
         username=user_doc["username"],
         email=user_doc["email"],
@@ -64,6 +160,8 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
         created_at=user_doc["created_at"],
         updated_at=user_doc["updated_at"]
     )
+    _user_cache[token] = (user, payload["exp"])
+    return user
 
 @router.post("/register", response_model=dict)
 async def register(user: UserCreate):
@@ -71,22 +169,8 @@ async def register(user: UserCreate):
     try:
         collection = MongoDB.get_collection("users")
         
-        # Check if user already exists
-        existing_user = await collection.find_one({
-            "$or": [
-                {"email": user.email},
-                {"username": user.username}
-            ]
-        })
-        
-        if existing_user:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="User with this email or username already exists"
-            )
-        
         # Hash password and create user
-        hashed_password = get_password_hash(user.password)
+        hashed_password = await run_password_task(get_password_hash, user.password)
         user_doc = UserInDB(
             username=user.username,
             email=user.email,
@@ -94,8 +178,14 @@ async def register(user: UserCreate):
             hashed_password=hashed_password
         )
         
-        # Insert user
-        result = await collection.insert_one(user_doc.dict(by_alias=True, exclude={"id"}))
+        # Insert user; the unique email/username indexes reject duplicates
+        try:
+            result = await collection.insert_one(user_doc.dict(by_alias=True, exclude={"id"}))
+        except DuplicateKeyError:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="User with this email or username already exists"
+            )
         user_id = str(result.inserted_id)
         
         # Create access token
@@ -110,6 +200,8 @@ async def register(user: UserCreate):
             "username": user.username
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Registration failed: {e}")
         raise HTTPException(
@@ -129,15 +221,31 @@ async def login(username: str, password: str):
                 {"username": username},
                 {"email": username}
             ]
-        })
+        }, {"username": 1, "hashed_password": 1, "is_active": 1})
+        
+        # Unknown users are checked against a dummy hash so timing doesn't reveal existence
+        if user_doc:
+            verified, new_hash = await run_password_task(
+                verify_and_update_password, password, user_doc["hashed_password"]
+            )
+        else:
+            await run_password_task(verify_password, password, _DUMMY_HASH)
+            verified, new_hash = False, None
         
-        if not user_doc or not verify_password(password, user_doc["hashed_password"]):
+        if not verified:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Incorrect username or password",
                 headers={"WWW-Authenticate": "Bearer"},
             )
         
+        # Transparently migrate hashes created with outdated settings
+        if new_hash:
+            await collection.update_one(
+                {"_id": user_doc["_id"]},
+                {"$set": {"hashed_password": new_hash}}
+            )
+        
         if not user_doc["is_active"]:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
@@ -182,29 +290,9 @@ async def update_current_user(
         # Prepare update data
         update_data = {}
         if user_update.username:
-            # Check if username is already taken
-            existing = await collection.find_one({
-                "username": user_update.username,
-                "_id": {"$ne": current_user.id}
-            })
-            if existing:
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail="Username already taken"
-                )
             update_data["username"] = user_update.username
             
         if user_update.email:
-            # Check if email is already taken
-            existing = await collection.find_one({
-                "email": user_update.email,
-                "_id": {"$ne": current_user.id}
-            })
-            if existing:
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail="Email already taken"
-                )
             update_data["email"] = user_update.email
             
         if user_update.full_name is not None:
@@ -212,13 +300,25 @@ async def update_current_user(
             
         if update_data:
             update_data["updated_at"] = datetime.utcnow()
-            await collection.update_one(
-                {"_id": current_user.id},
-                {"$set": update_data}
-            )
+            # The unique email/username indexes reject values taken by another user
+            try:
+                updated_doc = await collection.find_one_and_update(
+                    {"_id": current_user.id},
+                    {"$set": update_data},
+                    projection=USER_PROJECTION,
+                    return_document=ReturnDocument.AFTER
+                )
+            except DuplicateKeyError as e:
+                key_pattern = (e.details or {}).get("keyPattern", {})
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="Username already taken" if "username" in key_pattern else "Email already taken"
+                )
+            invalidate_cached_user(current_user.id)
+        else:
+            updated_doc = await collection.find_one({"_id": current_user.id}, USER_PROJECTION)
         
         # Return updated user
-        updated_doc = await collection.find_one({"_id": current_user.id})
         return User(
             id=str(updated_doc["_id"]),
             username=updated_doc["username"],
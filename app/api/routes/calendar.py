@@ -1,21 +1,90 @@
-from fastapi import APIRouter, HTTPException, Depends, status
-from typing import List, Optional
+from fastapi import APIRouter, BackgroundTasks, HTTPException, Depends, status
+from typing import List, Optional, Dict, Any
 from datetime import datetime, date
 import logging
 from bson import ObjectId
+from bson.errors import InvalidId
+from pymongo import ReturnDocument
 
 from app.models.calendar import CalendarEventCreate, CalendarEventUpdate, CalendarEvent, CalendarEventInDB, CalendarSyncStatus
 from app.models.user import User
 from app.api.routes.auth import get_current_user
 from app.core.database import MongoDB
-from app.services.apple_integration import AppleCalendarService
+from app.core.search_versions import invalidate_search_results
+from app.services.apple_integration import AppleCalendarService, get_apple_calendar_service
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
+# Fields needed to build a CalendarEvent response
+EVENT_PROJECTION = {
+    "title": 1, "description": 1, "start_date": 1, "end_date": 1, "location": 1,
+    "attendees": 1, "all_day": 1, "user_id": 1, "project_id": 1, "status": 1,
+    "apple_event_id": 1, "recurrence_type": 1, "recurrence_end": 1,
+    "created_at": 1, "updated_at": 1, "synced_at": 1
+}
+
+def _event_from_doc(doc: Dict[str, Any]) -> CalendarEvent:
+    """Build a CalendarEvent from a stored document without re-validating it"""
+    return CalendarEvent.model_construct(
+        id=str(doc["_id"]),
+        title=doc["title"],
+        description=doc.get("description"),
+        start_date=doc["start_date"],
+        end_date=doc["end_date"],
+        location=doc.get("location"),
+        attendees=doc.get("attendees", []),
+        all_day=doc.get("all_day", False),
+        user_id=doc["user_id"],
+        project_id=doc.get("project_id"),
+        status=doc["status"],
+        apple_event_id=doc.get("apple_event_id"),
+        recurrence_type=doc["recurrence_type"],
+        recurrence_end=doc.get("recurrence_end"),
+        created_at=doc["created_at"],
+        updated_at=doc["updated_at"],
+        synced_at=doc.get("synced_at")
+    )
+
+async def _sync_created_event(apple_service: AppleCalendarService, event_id: ObjectId, event_data: Dict[str, Any]):
+    """Background task to push a new event to Apple Calendar"""
+    try:
+        apple_event_id = await apple_service.create_event(event_data)
+        if apple_event_id:
+            collection = MongoDB.get_collection("calendar_events")
+            await collection.update_one(
+                {"_id": event_id},
+                {"$set": {"apple_event_id": apple_event_id, "synced_at": datetime.utcnow()}}
+            )
+    except Exception as e:
+        logger.warning(f"Failed to sync with Apple Calendar: {e}")
+
+async def _sync_updated_event(
+    apple_service: AppleCalendarService, event_id: ObjectId, apple_event_id: str, update_data: Dict[str, Any]
+):
+    """Background task to push event changes to Apple Calendar"""
+    try:
+        await apple_service.update_event(apple_event_id, update_data)
+        collection = MongoDB.get_collection("calendar_events")
+        await collection.update_one(
+            {"_id": event_id},
+            {"$set": {"synced_at": datetime.utcnow()}}
+        )
+    except Exception as e:
+        logger.warning(f"Failed to sync update with Apple Calendar: {e}")
+
+async def _sync_deleted_event(apple_service: AppleCalendarService, apple_event_id: str):
+    """Background task to remove an event from Apple Calendar"""
+    try:
+        await apple_service.delete_event(apple_event_id)
+    except Exception as e:
+        logger.warning(f"Failed to delete from Apple Calendar: {e}")
+
 @router.post("/events", response_model=CalendarEvent)
 async def create_event(
     event: CalendarEventCreate,
+    background_tasks: BackgroundTasks,
+    apple_service: AppleCalendarService = Depends(get_apple_calendar_service),
     current_user: User = Depends(get_current_user)
 ):
     """Create a new calendar event"""
@@ -31,42 +100,14 @@ async def create_event(
         # Insert event
         result = await collection.insert_one(event_doc.dict(by_alias=True, exclude={"id"}))
         
-        # Sync with Apple Calendar if enabled
-        apple_service = AppleCalendarService()
-        try:
-            apple_event_id = await apple_service.create_event(event_doc)
-            if apple_event_id:
-                await collection.update_one(
-                    {"_id": result.inserted_id},
-                    {"$set": {"apple_event_id": apple_event_id, "synced_at": datetime.utcnow()}}
-                )
-        except Exception as e:
-            logger.warning(f"Failed to sync with Apple Calendar: {e}")
-        
-        # Get created event
-        created_doc = await collection.find_one({"_id": result.inserted_id})
+        # Sync with Apple Calendar after the response is sent
+        background_tasks.add_task(_sync_created_event, apple_service, result.inserted_id, event_doc.dict())
         
+        invalidate_search_results(current_user.id)
         logger.info(f"Calendar event created: {event.title} by {current_user.username}")
         
-        return CalendarEvent(
-            id=str(created_doc["_id"]),
-            title=created_doc["title"],
-            description=created_doc.get("description"),
-            start_date=created_doc["start_date"],
-            end_date=created_doc["end_date"],
-            location=created_doc.get("location"),
-            attendees=created_doc.get("attendees", []),
-            all_day=created_doc.get("all_day", False),
-            user_id=created_doc["user_id"],
-            project_id=created_doc.get("project_id"),
-            status=created_doc["status"],
-            apple_event_id=created_doc.get("apple_event_id"),
-            recurrence_type=created_doc["recurrence_type"],
-            recurrence_end=created_doc.get("recurrence_end"),
-            created_at=created_doc["created_at"],
-            updated_at=created_doc["updated_at"],
-            synced_at=created_doc.get("synced_at")
-        )
+        # Build the response from the inserted document instead of re-reading it
+        return _event_from_doc({**event_doc.dict(exclude={"id"}), "_id": result.inserted_id})
         
     except Exception as e:
         logger.error(f"Calendar event creation failed: {e}")
@@ -103,31 +144,10 @@ async def get_events(
             query["project_id"] = project_id
         
         # Get events
-        cursor = collection.find(query).sort("start_date", 1).skip(skip).limit(limit)
+        cursor = collection.find(query, EVENT_PROJECTION).sort("start_date", 1).skip(skip).limit(limit)
         events = await cursor.to_list(length=limit)
         
-        return [
-            CalendarEvent(
-                id=str(doc["_id"]),
-                title=doc["title"],
-                description=doc.get("description"),
-                start_date=doc["start_date"],
-                end_date=doc["end_date"],
-                location=doc.get("location"),
-                attendees=doc.get("attendees", []),
-                all_day=doc.get("all_day", False),
-                user_id=doc["user_id"],
-                project_id=doc.get("project_id"),
-                status=doc["status"],
-                apple_event_id=doc.get("apple_event_id"),
-                recurrence_type=doc["recurrence_type"],
-                recurrence_end=doc.get("recurrence_end"),
-                created_at=doc["created_at"],
-                updated_at=doc["updated_at"],
-                synced_at=doc.get("synced_at")
-            )
-            for doc in events
-        ]
+        return [_event_from_doc(doc) for doc in events]
         
     except Exception as e:
         logger.error(f"Failed to get calendar events: {e}")
@@ -143,7 +163,9 @@ async def get_event(
 ):
     """Get a specific calendar event"""
     try:
-        if not ObjectId.is_valid(event_id):
+        try:
+            event_oid = ObjectId(event_id)
+        except InvalidId:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Invalid event ID"
@@ -151,9 +173,9 @@ async def get_event(
         
         collection = MongoDB.get_collection("calendar_events")
         doc = await collection.find_one({
-            "_id": ObjectId(event_id),
+            "_id": event_oid,
             "user_id": current_user.id
-        })
+        }, EVENT_PROJECTION)
         
         if not doc:
             raise HTTPException(
@@ -161,25 +183,7 @@ async def get_event(
                 detail="Calendar event not found"
             )
         
-        return CalendarEvent(
-            id=str(doc["_id"]),
-            title=doc["title"],
-            description=doc.get("description"),
-            start_date=doc["start_date"],
-            end_date=doc["end_date"],
-            location=doc.get("location"),
-            attendees=doc.get("attendees", []),
-            all_day=doc.get("all_day", False),
-            user_id=doc["user_id"],
-            project_id=doc.get("project_id"),
-            status=doc["status"],
-            apple_event_id=doc.get("apple_event_id"),
-            recurrence_type=doc["recurrence_type"],
-            recurrence_end=doc.get("recurrence_end"),
-            created_at=doc["created_at"],
-            updated_at=doc["updated_at"],
-            synced_at=doc.get("synced_at")
-        )
+        return _event_from_doc(doc)
         
     except HTTPException:
         raise
@@ -194,80 +198,54 @@ async def get_event(
 async def update_event(
     event_id: str,
     event_update: CalendarEventUpdate,
+    background_tasks: BackgroundTasks,
+    apple_service: AppleCalendarService = Depends(get_apple_calendar_service),
     current_user: User = Depends(get_current_user)
 ):
     """Update a calendar event"""
     try:
-        if not ObjectId.is_valid(event_id):
+        try:
+            event_oid = ObjectId(event_id)
+        except InvalidId:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Invalid event ID"
             )
         
         collection = MongoDB.get_collection("calendar_events")
+        event_filter = {"_id": event_oid, "user_id": current_user.id}
         
-        # Check if event exists and belongs to user
-        existing = await collection.find_one({
-            "_id": ObjectId(event_id),
-            "user_id": current_user.id
-        })
+        # Prepare update data
+        update_data = event_update.model_dump(exclude_unset=True, exclude_none=True)
         
-        if not existing:
+        if update_data:
+            update_data["updated_at"] = datetime.utcnow()
+            # Ownership check, update and read-back in a single round trip
+            updated_doc = await collection.find_one_and_update(
+                event_filter,
+                {"$set": update_data},
+                projection=EVENT_PROJECTION,
+                return_document=ReturnDocument.AFTER
+            )
+        else:
+            updated_doc = await collection.find_one(event_filter, EVENT_PROJECTION)
+        
+        if not updated_doc:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Calendar event not found"
             )
         
-        # Prepare update data
-        update_data = {}
-        for field, value in event_update.dict(exclude_unset=True).items():
-            if value is not None:
-                update_data[field] = value
-        
-        if update_data:
-            update_data["updated_at"] = datetime.utcnow()
-            await collection.update_one(
-                {"_id": ObjectId(event_id)},
-                {"$set": update_data}
+        if update_data and updated_doc.get("apple_event_id"):
+            # Sync with Apple Calendar after the response is sent
+            background_tasks.add_task(
+                _sync_updated_event, apple_service, updated_doc["_id"], updated_doc["apple_event_id"], update_data
             )
-            
-            # Sync with Apple Calendar if enabled
-            apple_service = AppleCalendarService()
-            try:
-                if existing.get("apple_event_id"):
-                    await apple_service.update_event(existing["apple_event_id"], update_data)
-                    update_data["synced_at"] = datetime.utcnow()
-                    await collection.update_one(
-                        {"_id": ObjectId(event_id)},
-                        {"$set": {"synced_at": update_data["synced_at"]}}
-                    )
-            except Exception as e:
-                logger.warning(f"Failed to sync update with Apple Calendar: {e}")
-        
-        # Return updated event
-        updated_doc = await collection.find_one({"_id": ObjectId(event_id)})
         
+        invalidate_search_results(current_user.id)
         logger.info(f"Calendar event updated: {event_id} by {current_user.username}")
         
-        return CalendarEvent(
-            id=str(updated_doc["_id"]),
-            title=updated_doc["title"],
-            description=updated_doc.get("description"),
-            start_date=updated_doc["start_date"],
-            end_date=updated_doc["end_date"],
-            location=updated_doc.get("location"),
-            attendees=updated_doc.get("attendees", []),
-            all_day=updated_doc.get("all_day", False),
-            user_id=updated_doc["user_id"],
-            project_id=updated_doc.get("project_id"),
-            status=updated_doc["status"],
-            apple_event_id=updated_doc.get("apple_event_id"),
-            recurrence_type=updated_doc["recurrence_type"],
-            recurrence_end=updated_doc.get("recurrence_end"),
-            created_at=updated_doc["created_at"],
-            updated_at=updated_doc["updated_at"],
-            synced_at=updated_doc.get("synced_at")
-        )
+        return _event_from_doc(updated_doc)
         
     except HTTPException:
         raise
@@ -281,11 +259,15 @@ async def update_event(
 @router.delete("/events/{event_id}")
 async def delete_event(
     event_id: str,
+    background_tasks: BackgroundTasks,
+    apple_service: AppleCalendarService = Depends(get_apple_calendar_service),
     current_user: User = Depends(get_current_user)
 ):
     """Delete a calendar event"""
     try:
-        if not ObjectId.is_valid(event_id):
+        try:
+            event_oid = ObjectId(event_id)
+        except InvalidId:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Invalid event ID"
@@ -293,11 +275,11 @@ async def delete_event(
         
         collection = MongoDB.get_collection("calendar_events")
         
-        # Check if event exists and belongs to user
-        existing = await collection.find_one({
-            "_id": ObjectId(event_id),
-            "user_id": current_user.id
-        })
+        # Ownership check and delete in a single round trip
+        existing = await collection.find_one_and_delete(
+            {"_id": event_oid, "user_id": current_user.id},
+            projection={"apple_event_id": 1}
+        )
         
         if not existing:
             raise HTTPException(
@@ -305,17 +287,11 @@ async def delete_event(
                 detail="Calendar event not found"
             )
         
-        # Delete from Apple Calendar if synced
+        # Delete from Apple Calendar after the response is sent
         if existing.get("apple_event_id"):
-            apple_service = AppleCalendarService()
-            try:
-                await apple_service.delete_event(existing["apple_event_id"])
-            except Exception as e:
-                logger.warning(f"Failed to delete from Apple Calendar: {e}")
-        
-        # Delete event
-        await collection.delete_one({"_id": ObjectId(event_id)})
+            background_tasks.add_task(_sync_deleted_event, apple_service, existing["apple_event_id"])
         
+        invalidate_search_results(current_user.id)
         logger.info(f"Calendar event deleted: {event_id} by {current_user.username}")
         
         return {"message": "Calendar event deleted successfully"}
@@ -331,12 +307,28 @@ async def delete_event(
 
 @router.post("/sync")
 async def sync_calendar(
+    apple_service: AppleCalendarService = Depends(get_apple_calendar_service),
     current_user: User = Depends(get_current_user)
 ):
     """Sync with Apple Calendar"""
     try:
-        apple_service = AppleCalendarService()
-        result = await apple_service.sync_calendar(current_user.id)
+        collection = MongoDB.get_collection("calendar_events")
+        
+        # Events never pushed to Apple go over in one round trip
+        pending = await collection.find(
+            {"user_id": current_user.id, "apple_event_id": None},
+            {"title": 1, "description": 1, "start_date": 1, "end_date": 1, "location": 1}
+        ).to_list(length=None)
+        
+        result = await apple_service.sync_calendar(current_user.id, pending)
+        
+        # Mark only the events Apple confirmed, so failed ones are retried next sync
+        synced_ids = result.pop("synced_ids", [])
+        if synced_ids:
+            await collection.update_many(
+                {"_id": {"$in": synced_ids}},
+                {"$set": {"apple_event_id": "apple_event_created", "synced_at": datetime.utcnow()}}
+            )
         
         logger.info(f"Calendar sync completed for user {current_user.username}")
         
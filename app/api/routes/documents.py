@@ -1,47 +1,133 @@
-from fastapi import APIRouter, HTTPException, Depends, status, UploadFile, File, Form
-from typing import List, Optional
+from fastapi import APIRouter, HTTPException, Depends, status, UploadFile, File, Form, BackgroundTasks
+from fastapi.responses import StreamingResponse
+from typing import List, Optional, Dict, Any
 from datetime import datetime
 import logging
 import os
 import aiofiles
+import aiofiles.os
 import asyncio
+from concurrent.futures import ProcessPoolExecutor
 from bson import ObjectId
+from bson.errors import InvalidId
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
 import mimetypes
+import orjson
+import xxhash
+from cachetools import TTLCache
 
-from app.models.document import DocumentCreate, DocumentUpdate, Document, DocumentInDB, DocumentType, DocumentProcessingStatus
+from app.models.document import DocumentCreate, DocumentUpdate, Document, DocumentInDB, DocumentType, DocumentProcessingStatus, word_count as count_words
 from app.models.user import User
 from app.api.routes.auth import get_current_user
-from app.core.database import MongoDB
-from app.core.memory_store import MemoryStore
+from app.core.database import MongoDB, InsertBatcher
+from app.core.search_fields import title_search_fields
+from app.core.search_versions import invalidate_search_results
+from app.core.memory_store import MemoryStore, build_content_preview
 from app.core.config import settings
-from app.services.document_processor import DocumentProcessor
+from app.core.responses import AppJSONResponse
+from app.services.document_processor import extract_text_with_word_count
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
+UPLOAD_CHUNK_SIZE = 4 * 1024 * 1024  # 4MB
+
+# Load the system MIME tables at import rather than on the first upload
+mimetypes.init()
+
+# Responses never include the embedding vector; listings also skip the heavy body fields
+DOCUMENT_PROJECTION = {"embedding": 0, "content_hash": 0}
+DOCUMENT_LIST_PROJECTION = {"content": 0, "entities": 0, "embedding": 0, "content_hash": 0}
+DOCUMENT_LIST_INDEX = "user_id_1_project_id_1_document_type_1_updated_at_-1"
+
+_document_inserts = InsertBatcher("documents")
+
+# Single-document reads keyed by document ID; entries are dropped on every write
+_document_cache = TTLCache(maxsize=10000, ttl=60)
+
+def invalidate_project_documents(user_id: str, project_id: str):
+    """Drop cached documents that belong to a project, e.g. after it is deleted"""
+    for document_id in list(_document_cache):
+        document = _document_cache.get(document_id)
+        if document is not None and document.project_id == project_id and document.user_id == user_id:
+            _document_cache.pop(document_id, None)
+
+# Text extraction is CPU-bound; keep it off the event loop in worker processes
+_processing_pool = ProcessPoolExecutor(max_workers=os.cpu_count())
+
+_MIME_TYPE_MAP = {
+    "text/plain": DocumentType.TEXT,
+    "application/pdf": DocumentType.PDF,
+    "application/msword": DocumentType.WORD,
+    "application/vnd.openxmlformats-officedocument.wordprocessingml.document": DocumentType.WORD,
+    "application/vnd.ms-excel": DocumentType.EXCEL,
+    "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet": DocumentType.EXCEL,
+    "application/vnd.ms-powerpoint": DocumentType.POWERPOINT,
+    "application/vnd.openxmlformats-officedocument.presentationml.presentation": DocumentType.POWERPOINT,
+    "image/jpeg": DocumentType.IMAGE,
+    "image/png": DocumentType.IMAGE,
+    "image/gif": DocumentType.IMAGE,
+    "audio/mpeg": DocumentType.AUDIO,
+    "audio/wav": DocumentType.AUDIO,
+    "video/mp4": DocumentType.VIDEO,
+    "video/avi": DocumentType.VIDEO,
+}
+
+_EXTENSION_TYPE_MAP = {
+    "txt": DocumentType.TEXT,
+    "md": DocumentType.TEXT,
+    "pdf": DocumentType.PDF,
+    "doc": DocumentType.WORD,
+    "docx": DocumentType.WORD,
+    "xls": DocumentType.EXCEL,
+    "xlsx": DocumentType.EXCEL,
+    "ppt": DocumentType.POWERPOINT,
+    "pptx": DocumentType.POWERPOINT,
+    "jpg": DocumentType.IMAGE,
+    "jpeg": DocumentType.IMAGE,
+    "png": DocumentType.IMAGE,
+    "gif": DocumentType.IMAGE,
+    "mp3": DocumentType.AUDIO,
+    "wav": DocumentType.AUDIO,
+    "mp4": DocumentType.VIDEO,
+    "avi": DocumentType.VIDEO,
+}
+
 def get_document_type_from_mime(mime_type: str) -> DocumentType:
     """Determine document type from MIME type"""
-    mime_mapping = {
-        "text/plain": DocumentType.TEXT,
-        "application/pdf": DocumentType.PDF,
-        "application/msword": DocumentType.WORD,
-        "application/vnd.openxmlformats-officedocument.wordprocessingml.document": DocumentType.WORD,
-        "application/vnd.ms-excel": DocumentType.EXCEL,
-        "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet": DocumentType.EXCEL,
-        "application/vnd.ms-powerpoint": DocumentType.POWERPOINT,
-        "application/vnd.openxmlformats-officedocument.presentationml.presentation": DocumentType.POWERPOINT,
-        "image/jpeg": DocumentType.IMAGE,
-        "image/png": DocumentType.IMAGE,
-        "image/gif": DocumentType.IMAGE,
-        "audio/mpeg": DocumentType.AUDIO,
-        "audio/wav": DocumentType.AUDIO,
-        "video/mp4": DocumentType.VIDEO,
-        "video/avi": DocumentType.VIDEO,
-    }
-    return mime_mapping.get(mime_type, DocumentType.OTHER)
+    return _MIME_TYPE_MAP.get(mime_type, DocumentType.OTHER)
+
+def get_document_type(filename: Optional[str], mime_type: Optional[str]) -> DocumentType:
+    """Determine document type from the file extension, falling back to MIME type"""
+    _, dot, ext = (filename or "").rpartition(".")
+    if dot and ext.lower() in _EXTENSION_TYPE_MAP:
+        return _EXTENSION_TYPE_MAP[ext.lower()]
+    return get_document_type_from_mime(mime_type or "")
+
+def _document_from_doc(doc: Dict[str, Any]) -> Document:
+    """Build a Document from a stored document without re-validating it"""
+    return Document.model_construct(
+        id=str(doc["_id"]),
+        title=doc["title"],
+        content=doc.get("content"),
+        file_path=doc.get("file_path"),
+        file_size=doc.get("file_size"),
+        mime_type=doc.get("mime_type"),
+        document_type=doc["document_type"],
+        tags=doc.get("tags", []),
+        user_id=doc["user_id"],
+        project_id=doc.get("project_id"),
+        word_count=doc.get("word_count", 0),
+        processed=doc.get("processed", False),
+        entities=doc.get("entities", []),
+        created_at=doc["created_at"],
+        updated_at=doc["updated_at"]
+    )
 
 @router.post("/upload", response_model=Document)
 async def upload_document(
+    background_tasks: BackgroundTasks,
     file: UploadFile = File(...),
     title: Optional[str] = Form(None),
     project_id: Optional[str] = Form(None),
@@ -49,6 +135,7 @@ async def upload_document(
     current_user: User = Depends(get_current_user)
 ):
     """Upload a document file"""
+    temp_path = None
     try:
         # Validate file size
         if file.size and file.size > settings.max_file_size:
@@ -59,21 +146,43 @@ async def upload_document(
         
         # Create upload directory if it doesn't exist
         upload_dir = f"{settings.upload_dir}/{current_user.id}"
-        os.makedirs(upload_dir, exist_ok=True)
-        
-        # Generate unique filename
-        timestamp = datetime.utcnow().strftime("%Y%m%d_%H%M%S")
-        filename = f"{timestamp}_{file.filename}"
-        file_path = os.path.join(upload_dir, filename)
+        await aiofiles.os.makedirs(upload_dir, exist_ok=True)
+        
+        # The document ID names the file, so concurrent uploads never share a path;
+        # bytes land in a temp file that only becomes the document's file after the insert
+        document_oid = ObjectId()
+        temp_path = os.path.join(upload_dir, f".{document_oid}.part")
+        file_path = os.path.join(upload_dir, f"{document_oid}_{file.filename}")
+        
+        # Stream file to disk in fixed-size chunks, enforcing the size limit as we go
+        file_size = 0
+        hasher = xxhash.xxh3_128()
+        async with aiofiles.open(temp_path, 'wb') as f:
+            while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+                file_size += len(chunk)
+                if file_size > settings.max_file_size:
+                    break
+                hasher.update(chunk)
+                await f.write(chunk)
+        
+        if file_size > settings.max_file_size:
+            raise HTTPException(
+                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                detail=f"File size exceeds maximum allowed size of {settings.max_file_size} bytes"
+            )
         
-        # Save file
-        async with aiofiles.open(file_path, 'wb') as f:
-            content = await file.read()
-            await f.write(content)
+        # Identical re-uploads into the same project resolve to the existing document
+        # instead of being stored and processed again
+        content_hash = hasher.hexdigest()
+        collection = MongoDB.get_collection("documents")
+        dedup_query = {"user_id": current_user.id, "project_id": project_id, "content_hash": content_hash}
+        existing = await collection.find_one(dedup_query)
+        if existing:
+            return _document_from_doc(existing)
         
         # Determine MIME type and document type
         mime_type = file.content_type or mimetypes.guess_type(file.filename)[0]
-        document_type = get_document_type_from_mime(mime_type or "")
+        document_type = get_document_type(file.filename, mime_type)
         
         # Parse tags
         tag_list = []
@@ -81,48 +190,45 @@ async def upload_document(
             tag_list = [tag.strip() for tag in tags.split(",") if tag.strip()]
         
         # Create document record
-        collection = MongoDB.get_collection("documents")
-        
         document_doc = DocumentInDB(
             title=title or file.filename,
             file_path=file_path,
-            file_size=file.size,
+            file_size=file_size,
             mime_type=mime_type,
             document_type=document_type,
             tags=tag_list,
             user_id=current_user.id,
-            project_id=project_id
+            project_id=project_id,
+            content_hash=content_hash
         )
         
-        # Insert document
-        result = await collection.insert_one(document_doc.dict(by_alias=True, exclude={"id"}))
-        document_id = str(result.inserted_id)
+        # Insert document, batched with concurrent uploads; the driver sets _id on the dict
+        document_data = document_doc.model_dump()
+        document_data["_id"] = document_oid
+        document_data.update(title_search_fields(document_doc.title))
+        try:
+            await _document_inserts.insert(document_data)
+        except DuplicateKeyError:
+            # A concurrent upload of the same file won the race; that document may
+            # already be gone again, in which case the client has to retry
+            existing = await collection.find_one(dedup_query)
+            if existing is None:
+                raise HTTPException(
+                    status_code=status.HTTP_409_CONFLICT,
+                    detail="Document was modified concurrently, please retry the upload"
+                )
+            return _document_from_doc(existing)
+        await aiofiles.os.rename(temp_path, file_path)
+        temp_path = None
+        document_id = str(document_oid)
         
         # Start background processing
-        asyncio.create_task(process_document_background(document_id, file_path))
-        
-        # Get the created document
-        created_doc = await collection.find_one({"_id": result.inserted_id})
+        background_tasks.add_task(process_document_background, document_id, file_path, current_user.id)
         
+        invalidate_search_results(current_user.id)
         logger.info(f"Document uploaded: {file.filename} by {current_user.username}")
         
-        return Document(
-            id=str(created_doc["_id"]),
-            title=created_doc["title"],
-            content=created_doc.get("content"),
-            file_path=created_doc.get("file_path"),
-            file_size=created_doc.get("file_size"),
-            mime_type=created_doc.get("mime_type"),
-            document_type=created_doc["document_type"],
-            tags=created_doc.get("tags", []),
-            user_id=created_doc["user_id"],
-            project_id=created_doc.get("project_id"),
-            word_count=created_doc.get("word_count", 0),
-            processed=created_doc.get("processed", False),
-            entities=created_doc.get("entities", []),
-            created_at=created_doc["created_at"],
-            updated_at=created_doc["updated_at"]
-        )
+        return _document_from_doc(document_data)
         
     except HTTPException:
         raise
@@ -132,18 +238,30 @@ async def upload_document(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Failed to upload document"
         )
+    finally:
+        # Every exit before the rename leaves the temp file behind otherwise
+        if temp_path and await aiofiles.os.path.exists(temp_path):
+            await aiofiles.os.remove(temp_path)
+
+async def warm_processing_pool():
+    """Fork the processing workers now, before database threads exist"""
+    loop = asyncio.get_running_loop()
+    await loop.run_in_executor(_processing_pool, os.getpid)
 
-async def process_document_background(document_id: str, file_path: str):
+def shutdown_processing_pool():
+    """Stop the document processing workers"""
+    _processing_pool.shutdown(wait=False, cancel_futures=True)
+
+async def process_document_background(document_id: str, file_path: str, user_id: str):
     """Background task to process uploaded document"""
     try:
-        # Process the document to extract text content
-        processor = DocumentProcessor()
-        content = await processor.extract_text(file_path)
+        # Extract text and count words in a worker process; parsing is CPU-bound
+        loop = asyncio.get_running_loop()
+        content, word_count = await loop.run_in_executor(
+            _processing_pool, extract_text_with_word_count, file_path
+        )
         
         if content:
-            # Count words
-            word_count = len(content.split())
-            
             # Add to memory store for entity extraction
             memory_result = await MemoryStore.add_memory(
                 user_id="", # Will be populated from document
@@ -158,6 +276,7 @@ async def process_document_background(document_id: str, file_path: str):
                 {
                     "$set": {
                         "content": content,
+                        "content_preview": build_content_preview(content),
                         "word_count": word_count,
                         "processed": True,
                         "entities": memory_result.get("entities", []),
@@ -166,6 +285,8 @@ async def process_document_background(document_id: str, file_path: str):
                 }
             )
             
+            _document_cache.pop(document_id, None)
+            invalidate_search_results(user_id)
             logger.info(f"Document processed successfully: {document_id}")
         
     except Exception as e:
@@ -176,10 +297,12 @@ async def process_document_background(document_id: str, file_path: str):
             {"_id": ObjectId(document_id)},
             {"$set": {"processed": False, "updated_at": datetime.utcnow()}}
         )
+        _document_cache.pop(document_id, None)
 
 @router.post("/", response_model=Document)
 async def create_document(
     document: DocumentCreate,
+    background_tasks: BackgroundTasks,
     current_user: User = Depends(get_current_user)
 ):
     """Create a text document"""
@@ -189,49 +312,35 @@ async def create_document(
         # Count words if content provided
         word_count = 0
         if document.content:
-            word_count = len(document.content.split())
+            word_count = count_words(document.content)
         
         # Create document
         document_doc = DocumentInDB(
-            **document.dict(),
+            **document.model_dump(),
             user_id=current_user.id,
             word_count=word_count,
             processed=bool(document.content)  # Mark as processed if content provided
         )
         
-        # Insert document
-        result = await collection.insert_one(document_doc.dict(by_alias=True, exclude={"id"}))
+        # Insert document; the driver sets _id on the dict
+        document_data = document_doc.model_dump()
+        document_data.update(title_search_fields(document_doc.title))
+        document_data["content_preview"] = build_content_preview(document_doc.content or "")
+        result = await collection.insert_one(document_data)
         
-        # Add to memory store if content exists
+        # Add to memory store after the response is sent
         if document.content:
-            await MemoryStore.add_memory(
+            background_tasks.add_task(
+                MemoryStore.add_memory,
                 user_id=current_user.id,
                 content=document.content,
                 metadata={"document_id": str(result.inserted_id), "source": "document"}
             )
         
-        # Get created document
-        created_doc = await collection.find_one({"_id": result.inserted_id})
-        
+        invalidate_search_results(current_user.id)
         logger.info(f"Document created: {document.title} by {current_user.username}")
         
-        return Document(
-            id=str(created_doc["_id"]),
-            title=created_doc["title"],
-            content=created_doc.get("content"),
-            file_path=created_doc.get("file_path"),
-            file_size=created_doc.get("file_size"),
-            mime_type=created_doc.get("mime_type"),
-            document_type=created_doc["document_type"],
-            tags=created_doc.get("tags", []),
-            user_id=created_doc["user_id"],
-            project_id=created_doc.get("project_id"),
-            word_count=created_doc.get("word_count", 0),
-            processed=created_doc.get("processed", False),
-            entities=created_doc.get("entities", []),
-            created_at=created_doc["created_at"],
-            updated_at=created_doc["updated_at"]
-        )
+        return _document_from_doc(document_data)
         
     except Exception as e:
         logger.error(f"Document creation failed: {e}")
@@ -240,6 +349,17 @@ async def create_document(
             detail="Failed to create document"
         )
 
+async def _stream_documents(first_doc: Dict[str, Any], cursor):
+    """Yield listing rows as a JSON array, one document at a time"""
+    yield b"[" + orjson.dumps(_document_from_doc(first_doc).fast_dump())
+    try:
+        async for doc in cursor:
+            yield b"," + orjson.dumps(_document_from_doc(doc).fast_dump())
+    except Exception as e:
+        logger.error(f"Document listing stream failed: {e}")
+        raise
+    yield b"]"
+
 @router.get("/", response_model=List[Document])
 async def get_documents(
     skip: int = 0,
@@ -266,29 +386,27 @@ async def get_documents(
             query["$text"] = {"$search": search}
         
         # Get documents
-        cursor = collection.find(query).sort("updated_at", -1).skip(skip).limit(limit)
-        documents = await cursor.to_list(length=limit)
-        
-        return [
-            Document(
-                id=str(doc["_id"]),
-                title=doc["title"],
-                content=doc.get("content"),
-                file_path=doc.get("file_path"),
-                file_size=doc.get("file_size"),
-                mime_type=doc.get("mime_type"),
-                document_type=doc["document_type"],
-                tags=doc.get("tags", []),
-                user_id=doc["user_id"],
-                project_id=doc.get("project_id"),
-                word_count=doc.get("word_count", 0),
-                processed=doc.get("processed", False),
-                entities=doc.get("entities", []),
-                created_at=doc["created_at"],
-                updated_at=doc["updated_at"]
-            )
-            for doc in documents
-        ]
+        cursor = (
+            collection.find(query, DOCUMENT_LIST_PROJECTION)
+            .sort("updated_at", -1)
+            .skip(skip)
+            .limit(limit)
+            .batch_size(limit)  # whole page in the first reply
+        )
+        if project_id and document_type and not search:
+            # Only with both filters does this index give equality on every prefix field and
+            # serve the sort; $text queries must use the text index, and the planner picks
+            # (user_id, updated_at) for the other listings
+            cursor = cursor.hint(DOCUMENT_LIST_INDEX)
+        
+        # Fetch the first row up front so query errors still surface as a 500
+        try:
+            first_doc = await cursor.next()
+        except StopAsyncIteration:
+            return AppJSONResponse([])
+        
+        # Stream the rest as a JSON array; response_model still documents the schema
+        return StreamingResponse(_stream_documents(first_doc, cursor), media_type="application/json")
         
     except Exception as e:
         logger.error(f"Failed to get documents: {e}")
@@ -304,17 +422,20 @@ async def get_document(
 ):
     """Get a specific document"""
     try:
-        if not ObjectId.is_valid(document_id):
+        try:
+            document_oid = ObjectId(document_id)
+        except InvalidId:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Invalid document ID"
             )
         
+        cached = _document_cache.get(document_id)
+        if cached and cached.user_id == current_user.id:
+            return cached
+        
         collection = MongoDB.get_collection("documents")
-        doc = await collection.find_one({
-            "_id": ObjectId(document_id),
-            "user_id": current_user.id
-        })
+        doc = await collection.find_one({"_id": document_oid, "user_id": current_user.id}, DOCUMENT_PROJECTION)
         
         if not doc:
             raise HTTPException(
@@ -322,23 +443,9 @@ async def get_document(
                 detail="Document not found"
             )
         
-        return Document(
-            id=str(doc["_id"]),
-            title=doc["title"],
-            content=doc.get("content"),
-            file_path=doc.get("file_path"),
-            file_size=doc.get("file_size"),
-            mime_type=doc.get("mime_type"),
-            document_type=doc["document_type"],
-            tags=doc.get("tags", []),
-            user_id=doc["user_id"],
-            project_id=doc.get("project_id"),
-            word_count=doc.get("word_count", 0),
-            processed=doc.get("processed", False),
-            entities=doc.get("entities", []),
-            created_at=doc["created_at"],
-            updated_at=doc["updated_at"]
-        )
+        document = _document_from_doc(doc)
+        _document_cache[document_id] = document
+        return document
         
     except HTTPException:
         raise
@@ -353,76 +460,66 @@ async def get_document(
 async def update_document(
     document_id: str,
     document_update: DocumentUpdate,
+    background_tasks: BackgroundTasks,
     current_user: User = Depends(get_current_user)
 ):
     """Update a document"""
     try:
-        if not ObjectId.is_valid(document_id):
+        try:
+            document_oid = ObjectId(document_id)
+        except InvalidId:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Invalid document ID"
             )
         
         collection = MongoDB.get_collection("documents")
-        
-        # Check if document exists and belongs to user
-        existing = await collection.find_one({
-            "_id": ObjectId(document_id),
-            "user_id": current_user.id
-        })
-        
-        if not existing:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Document not found"
-            )
+        document_filter = {"_id": document_oid, "user_id": current_user.id}
         
         # Prepare update data
-        update_data = {}
-        for field, value in document_update.dict(exclude_unset=True).items():
-            if value is not None:
-                update_data[field] = value
+        update_data = document_update.model_dump(exclude_unset=True, exclude_none=True)
         
         # Update word count if content changed
         if "content" in update_data and update_data["content"]:
-            update_data["word_count"] = len(update_data["content"].split())
-            
-            # Add updated content to memory store
-            await MemoryStore.add_memory(
-                user_id=current_user.id,
-                content=update_data["content"],
-                metadata={"document_id": document_id, "source": "document_update"}
-            )
+            update_data["word_count"] = count_words(update_data["content"])
+            update_data["content_preview"] = build_content_preview(update_data["content"])
         
+        # Ownership check and update in a single round trip; the pre-image tells us
+        # whether the content actually changed, and the response applies the $set to it
         if update_data:
             update_data["updated_at"] = datetime.utcnow()
-            await collection.update_one(
-                {"_id": ObjectId(document_id)},
-                {"$set": update_data}
+            if "title" in update_data:
+                update_data.update(title_search_fields(update_data["title"]))
+            previous_doc = await collection.find_one_and_update(
+                document_filter,
+                {"$set": update_data},
+                projection=DOCUMENT_PROJECTION,
+                return_document=ReturnDocument.BEFORE
+            )
+        else:
+            previous_doc = await collection.find_one(document_filter, DOCUMENT_PROJECTION)
+        
+        if not previous_doc:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Document not found"
             )
         
-        # Return updated document
-        updated_doc = await collection.find_one({"_id": ObjectId(document_id)})
+        # Add updated content to memory store after the response, skipping no-op content edits
+        new_content = update_data.get("content")
+        if new_content and new_content != previous_doc.get("content"):
+            background_tasks.add_task(
+                MemoryStore.add_memory,
+                user_id=current_user.id,
+                content=new_content,
+                metadata={"document_id": document_id, "source": "document_update"}
+            )
         
+        _document_cache.pop(document_id, None)
+        invalidate_search_results(current_user.id)
         logger.info(f"Document updated: {document_id} by {current_user.username}")
         
-        return Document(
-            id=str(updated_doc["_id"]),
-            title=updated_doc["title"],
-            content=updated_doc.get("content"),
-            file_path=updated_doc.get("file_path"),
-            file_size=updated_doc.get("file_size"),
-            mime_type=updated_doc.get("mime_type"),
-            document_type=updated_doc["document_type"],
-            tags=updated_doc.get("tags", []),
-            user_id=updated_doc["user_id"],
-            project_id=updated_doc.get("project_id"),
-            word_count=updated_doc.get("word_count", 0),
-            processed=updated_doc.get("processed", False),
-            entities=updated_doc.get("entities", []),
-            created_at=updated_doc["created_at"],
-            updated_at=updated_doc["updated_at"]
-        )
+        return _document_from_doc({**previous_doc, **update_data})
         
     except HTTPException:
         raise
@@ -433,14 +530,26 @@ async def update_document(
             detail="Failed to update document"
         )
 
+async def _remove_stored_file(file_path: str):
+    """Remove an uploaded file, tolerating one that is already gone"""
+    try:
+        await aiofiles.os.remove(file_path)
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        logger.warning(f"Failed to delete file {file_path}: {e}")
+
 @router.delete("/{document_id}")
 async def delete_document(
     document_id: str,
+    background_tasks: BackgroundTasks,
     current_user: User = Depends(get_current_user)
 ):
     """Delete a document"""
     try:
-        if not ObjectId.is_valid(document_id):
+        try:
+            document_oid = ObjectId(document_id)
+        except InvalidId:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Invalid document ID"
@@ -448,11 +557,11 @@ async def delete_document(
         
         collection = MongoDB.get_collection("documents")
         
-        # Check if document exists and belongs to user
-        existing = await collection.find_one({
-            "_id": ObjectId(document_id),
-            "user_id": current_user.id
-        })
+        # Ownership check and delete in a single round trip
+        existing = await collection.find_one_and_delete(
+            {"_id": document_oid, "user_id": current_user.id},
+            projection={"file_path": 1}
+        )
         
         if not existing:
             raise HTTPException(
@@ -460,16 +569,12 @@ async def delete_document(
                 detail="Document not found"
             )
         
-        # Delete file if it exists
-        if existing.get("file_path") and os.path.exists(existing["file_path"]):
-            try:
-                os.remove(existing["file_path"])
-            except Exception as e:
-                logger.warning(f"Failed to delete file {existing['file_path']}: {e}")
-        
-        # Delete document record
-        await collection.delete_one({"_id": ObjectId(document_id)})
+        # Remove the stored file after the response is sent
+        if existing.get("file_path"):
+            background_tasks.add_task(_remove_stored_file, existing["file_path"])
         
+        _document_cache.pop(document_id, None)
+        invalidate_search_results(current_user.id)
         logger.info(f"Document deleted: {document_id} by {current_user.username}")
         
         return {"message": "Document deleted successfully"}
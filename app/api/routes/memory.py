@@ -63,13 +63,17 @@ async def search_memories(
 @router.get("/entity/{entity_name}")
 async def get_entity_knowledge(
     entity_name: str,
+    skip: int = 0,
+    limit: int = 50,
     current_user: User = Depends(get_current_user)
 ):
     """Get all knowledge about a specific entity (person, place, etc.)"""
     try:
         result = await MemoryStore.get_entity_knowledge(
             user_id=current_user.id,
-            entity_name=entity_name
+            entity_name=entity_name,
+            skip=skip,
+            limit=limit
         )
         
         return result
@@ -1,17 +1,60 @@
-from fastapi import APIRouter, HTTPException, Depends, status
-from typing import List, Optional
-from datetime import datetime
+from fastapi import APIRouter, HTTPException, Depends, status, Response
+from typing import Optional, Dict, Any
+import asyncio
 import logging
+import orjson
 from bson import ObjectId
+from bson.errors import InvalidId
+from cachetools import TTLCache
+from pymongo import ReturnDocument
 
-from app.models.project import ProjectCreate, ProjectUpdate, Project, ProjectInDB, ProjectStats
+from app.models.project import ProjectCreate, ProjectUpdate, Project, ProjectInDB, ProjectPage, ProjectStats
 from app.models.user import User
 from app.api.routes.auth import get_current_user
+from app.api.routes.documents import invalidate_project_documents
+from app.core.clock import utcnow
 from app.core.database import MongoDB
+from app.core.pagination import decode_cursor, encode_cursor, keyset_filter
+from app.core.search_fields import title_search_fields
+from app.core.search_versions import invalidate_search_results
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
+# Fields needed to build a Project response
+PROJECT_PROJECTION = {
+    "title": 1, "description": 1, "instructions": 1, "tags": 1, "color": 1,
+    "user_id": 1, "is_archived": 1, "document_count": 1, "last_activity": 1,
+    "created_at": 1, "updated_at": 1
+}
+
+# Changing any of these counts as project activity
+_CONTENT_FIELDS = frozenset(("title", "description", "instructions"))
+
+# Serialized project listings per user: user_id -> {(skip, limit, include_archived, before): JSON bytes}
+_project_list_cache = TTLCache(maxsize=10000, ttl=30)
+
+def invalidate_project_lists(user_id: str):
+    """Drop every cached project listing for the given user"""
+    _project_list_cache.pop(user_id, None)
+
+def _project_from_doc(doc: Dict[str, Any]) -> Project:
+    """Build a Project from a stored document without re-validating it"""
+    return Project.model_construct(
+        id=str(doc["_id"]),
+        title=doc["title"],
+        description=doc.get("description"),
+        instructions=doc.get("instructions"),
+        tags=doc.get("tags", []),
+        color=doc.get("color", "#3498db"),
+        user_id=doc["user_id"],
+        is_archived=doc.get("is_archived", False),
+        document_count=doc.get("document_count", 0),
+        last_activity=doc.get("last_activity", doc["created_at"]),
+        created_at=doc["created_at"],
+        updated_at=doc["updated_at"]
+    )
+
 @router.post("/", response_model=Project)
 async def create_project(
     project: ProjectCreate,
@@ -28,27 +71,16 @@ async def create_project(
         )
         
         # Insert project
-        result = await collection.insert_one(project_doc.dict(by_alias=True, exclude={"id"}))
-        
-        # Return created project
-        created_doc = await collection.find_one({"_id": result.inserted_id})
+        result = await collection.insert_one({
+            **project_doc.dict(by_alias=True, exclude={"id"}),
+            **title_search_fields(project_doc.title)
+        })
         
+        invalidate_project_lists(current_user.id)
+        invalidate_search_results(current_user.id)
         logger.info(f"Project created: {project.title} by {current_user.username}")
         
-        return Project(
-            id=str(created_doc["_id"]),
-            title=created_doc["title"],
-            description=created_doc.get("description"),
-            instructions=created_doc.get("instructions"),
-            tags=created_doc.get("tags", []),
-            color=created_doc.get("color", "#3498db"),
-            user_id=created_doc["user_id"],
-            is_archived=created_doc["is_archived"],
-            document_count=created_doc["document_count"],
-            last_activity=created_doc["last_activity"],
-            created_at=created_doc["created_at"],
-            updated_at=created_doc["updated_at"]
-        )
+        return _project_from_doc({**project_doc.dict(exclude={"id"}), "_id": result.inserted_id})
         
     except Exception as e:
         logger.error(f"Project creation failed: {e}")
@@ -57,15 +89,27 @@ async def create_project(
             detail="Failed to create project"
         )
 
-@router.get("/", response_model=List[Project])
+@router.get("/", response_model=ProjectPage)
 async def get_projects(
     skip: int = 0,
     limit: int = 50,
     include_archived: bool = False,
+    before: Optional[str] = None,  # next_before from the previous page
     current_user: User = Depends(get_current_user)
 ):
     """Get user's projects"""
     try:
+        if before and skip:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Use either skip or before, not both"
+            )
+        
+        cache_key = (skip, limit, include_archived, before)
+        user_lists = _project_list_cache.get(current_user.id)
+        if user_lists is not None and cache_key in user_lists:
+            return Response(content=user_lists[cache_key], media_type="application/json")
+        
         collection = MongoDB.get_collection("projects")
         
         # Build query
@@ -73,28 +117,39 @@ async def get_projects(
         if not include_archived:
             query["is_archived"] = {"$ne": True}
         
+        # Keyset pagination seeks straight to the page instead of walking past `skip` entries
+        if before:
+            try:
+                before_value, before_id = decode_cursor(before)
+            except ValueError:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="Invalid cursor"
+                )
+            query.update(keyset_filter("updated_at", before_value, before_id, -1))
+        
         # Get projects
-        cursor = collection.find(query).sort("updated_at", -1).skip(skip).limit(limit)
-        projects = await cursor.to_list(length=limit)
-        
-        return [
-            Project(
-                id=str(doc["_id"]),
-                title=doc["title"],
-                description=doc.get("description"),
-                instructions=doc.get("instructions"),
-                tags=doc.get("tags", []),
-                color=doc.get("color", "#3498db"),
-                user_id=doc["user_id"],
-                is_archived=doc.get("is_archived", False),
-                document_count=doc.get("document_count", 0),
-                last_activity=doc.get("last_activity", doc["created_at"]),
-                created_at=doc["created_at"],
-                updated_at=doc["updated_at"]
-            )
-            for doc in projects
-        ]
+        cursor = (
+            collection.find(query, PROJECT_PROJECTION)
+            .sort([("updated_at", -1), ("_id", -1)])
+            .skip(skip)
+            .limit(limit)
+        )
+        items = []
+        last_doc = None
+        async for last_doc in cursor:
+            items.append(_project_from_doc(last_doc).fast_dump())
+        next_before = None
+        if last_doc is not None and len(items) == limit:
+            next_before = encode_cursor(last_doc["updated_at"], last_doc["_id"])
+        
+        # Serialize once with orjson; response_model still documents the schema but skips re-validating every row
+        body = orjson.dumps({"items": items, "next_before": next_before})
+        _project_list_cache.setdefault(current_user.id, {})[cache_key] = body
+        return Response(content=body, media_type="application/json")
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Failed to get projects: {e}")
         raise HTTPException(
@@ -109,7 +164,9 @@ async def get_project(
 ):
     """Get a specific project"""
     try:
-        if not ObjectId.is_valid(project_id):
+        try:
+            project_oid = ObjectId(project_id)
+        except InvalidId:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Invalid project ID"
@@ -117,9 +174,9 @@ async def get_project(
         
         collection = MongoDB.get_collection("projects")
         doc = await collection.find_one({
-            "_id": ObjectId(project_id),
+            "_id": project_oid,
             "user_id": current_user.id
-        })
+        }, PROJECT_PROJECTION)
         
         if not doc:
             raise HTTPException(
@@ -127,20 +184,7 @@ async def get_project(
                 detail="Project not found"
             )
         
-        return Project(
-            id=str(doc["_id"]),
-            title=doc["title"],
-            description=doc.get("description"),
-            instructions=doc.get("instructions"),
-            tags=doc.get("tags", []),
-            color=doc.get("color", "#3498db"),
-            user_id=doc["user_id"],
-            is_archived=doc.get("is_archived", False),
-            document_count=doc.get("document_count", 0),
-            last_activity=doc.get("last_activity", doc["created_at"]),
-            created_at=doc["created_at"],
-            updated_at=doc["updated_at"]
-        )
+        return _project_from_doc(doc)
         
     except HTTPException:
         raise
@@ -159,63 +203,51 @@ async def update_project(
 ):
     """Update a project"""
     try:
-        if not ObjectId.is_valid(project_id):
+        try:
+            project_oid = ObjectId(project_id)
+        except InvalidId:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Invalid project ID"
             )
         
         collection = MongoDB.get_collection("projects")
-        
-        # Check if project exists and belongs to user
-        existing = await collection.find_one({
-            "_id": ObjectId(project_id),
-            "user_id": current_user.id
-        })
-        
-        if not existing:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Project not found"
-            )
+        project_filter = {"_id": project_oid, "user_id": current_user.id}
         
         # Prepare update data
-        update_data = {}
-        for field, value in project_update.dict(exclude_unset=True).items():
-            if value is not None:
-                update_data[field] = value
+        update_data = project_update.model_dump(exclude_unset=True, exclude_none=True)
         
+        # Ownership check, update and re-read in a single round trip
         if update_data:
-            update_data["updated_at"] = datetime.utcnow()
+            now = utcnow()
+            update_data["updated_at"] = now
+            if "title" in update_data:
+                update_data.update(title_search_fields(update_data["title"]))
             
             # Update last_activity if content changed
-            if any(field in update_data for field in ["title", "description", "instructions"]):
-                update_data["last_activity"] = datetime.utcnow()
+            if _CONTENT_FIELDS.intersection(update_data):
+                update_data["last_activity"] = now
             
-            await collection.update_one(
-                {"_id": ObjectId(project_id)},
-                {"$set": update_data}
+            updated_doc = await collection.find_one_and_update(
+                project_filter,
+                {"$set": update_data},
+                projection=PROJECT_PROJECTION,
+                return_document=ReturnDocument.AFTER
             )
+        else:
+            updated_doc = await collection.find_one(project_filter, PROJECT_PROJECTION)
         
-        # Return updated project
-        updated_doc = await collection.find_one({"_id": ObjectId(project_id)})
+        if not updated_doc:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Project not found"
+            )
         
+        invalidate_project_lists(current_user.id)
+        invalidate_search_results(current_user.id)
         logger.info(f"Project updated: {project_id} by {current_user.username}")
         
-        return Project(
-            id=str(updated_doc["_id"]),
-            title=updated_doc["title"],
-            description=updated_doc.get("description"),
-            instructions=updated_doc.get("instructions"),
-            tags=updated_doc.get("tags", []),
-            color=updated_doc.get("color", "#3498db"),
-            user_id=updated_doc["user_id"],
-            is_archived=updated_doc.get("is_archived", False),
-            document_count=updated_doc.get("document_count", 0),
-            last_activity=updated_doc.get("last_activity", updated_doc["created_at"]),
-            created_at=updated_doc["created_at"],
-            updated_at=updated_doc["updated_at"]
-        )
+        return _project_from_doc(updated_doc)
         
     except HTTPException:
         raise
@@ -233,7 +265,9 @@ async def delete_project(
 ):
     """Delete a project (and optionally its documents)"""
     try:
-        if not ObjectId.is_valid(project_id):
+        try:
+            project_oid = ObjectId(project_id)
+        except InvalidId:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Invalid project ID"
@@ -242,13 +276,13 @@ async def delete_project(
         projects_collection = MongoDB.get_collection("projects")
         documents_collection = MongoDB.get_collection("documents")
         
-        # Check if project exists and belongs to user
-        existing = await projects_collection.find_one({
-            "_id": ObjectId(project_id),
-            "user_id": current_user.id
-        })
+        # Ownership check and delete in a single round trip
+        deleted = await projects_collection.find_one_and_delete(
+            {"_id": project_oid, "user_id": current_user.id},
+            projection={"_id": 1}
+        )
         
-        if not existing:
+        if not deleted:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Project not found"
@@ -256,13 +290,13 @@ async def delete_project(
         
         # Update documents to remove project reference (don't delete documents)
         await documents_collection.update_many(
-            {"project_id": project_id},
+            {"project_id": project_id, "user_id": current_user.id},
             {"$unset": {"project_id": ""}}
         )
         
-        # Delete the project
-        await projects_collection.delete_one({"_id": ObjectId(project_id)})
-        
+        invalidate_project_documents(current_user.id, project_id)
+        invalidate_project_lists(current_user.id)
+        invalidate_search_results(current_user.id)
         logger.info(f"Project deleted: {project_id} by {current_user.username}")
         
         return {"message": "Project deleted successfully"}
@@ -283,7 +317,9 @@ async def get_project_stats(
 ):
     """Get project statistics"""
     try:
-        if not ObjectId.is_valid(project_id):
+        try:
+            project_oid = ObjectId(project_id)
+        except InvalidId:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Invalid project ID"
@@ -292,21 +328,10 @@ async def get_project_stats(
         projects_collection = MongoDB.get_collection("projects")
         documents_collection = MongoDB.get_collection("documents")
         
-        # Check if project exists and belongs to user
-        project = await projects_collection.find_one({
-            "_id": ObjectId(project_id),
-            "user_id": current_user.id
-        })
-        
-        if not project:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Project not found"
-            )
-        
         # Get document statistics
         pipeline = [
             {"$match": {"project_id": project_id, "user_id": current_user.id}},
+            {"$project": {"_id": 0, "word_count": 1, "updated_at": 1}},
             {"$group": {
                 "_id": None,
                 "document_count": {"$sum": 1},
@@ -315,7 +340,20 @@ async def get_project_stats(
             }}
         ]
         
-        result = await documents_collection.aggregate(pipeline).to_list(length=1)
+        # The ownership check and the aggregation are independent, so run them together
+        project, result = await asyncio.gather(
+            projects_collection.find_one({
+                "_id": project_oid,
+                "user_id": current_user.id
+            }, {"created_at": 1}),
+            documents_collection.aggregate(pipeline).to_list(length=1)
+        )
+        
+        if not project:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Project not found"
+            )
         
         if result:
             stats = result[0]
@@ -1,21 +1,131 @@
-from fastapi import APIRouter, HTTPException, Depends, status
-from typing import List, Optional
+from fastapi import APIRouter, HTTPException, Depends, status, Response, BackgroundTasks
+# get_reminders has a `status` filter parameter that shadows the module
+from fastapi.status import HTTP_400_BAD_REQUEST, HTTP_500_INTERNAL_SERVER_ERROR
+from typing import List, Optional, Dict, Any
 from datetime import datetime, date
 import logging
+import orjson
 from bson import ObjectId
+from bson.errors import InvalidId
+from cachetools import TTLCache
+from pymongo import ReturnDocument
 
-from app.models.reminder import ReminderCreate, ReminderUpdate, Reminder, ReminderInDB, ReminderSyncStatus, ReminderPriority, ReminderStatus
+from app.models.reminder import ReminderCreate, ReminderUpdate, Reminder, ReminderInDB, ReminderPage, ReminderSyncStatus, ReminderPriority, ReminderStatus
 from app.models.user import User
 from app.api.routes.auth import get_current_user
 from app.core.database import MongoDB
-from app.services.apple_integration import AppleRemindersService
+from app.core.pagination import decode_cursor, encode_cursor, keyset_filter
+from app.core.search_versions import invalidate_search_results
+from app.services.apple_integration import AppleRemindersService, get_apple_reminders_service
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
+# Fields needed to build a Reminder response
+REMINDER_PROJECTION = {
+    "title": 1, "description": 1, "due_date": 1, "priority": 1, "tags": 1,
+    "user_id": 1, "project_id": 1, "related_document_id": 1, "status": 1,
+    "apple_reminder_id": 1, "completed_at": 1, "created_at": 1, "updated_at": 1,
+    "synced_at": 1
+}
+
+_MAX_TIME = datetime.max.time()
+
+# Serialized reminder listings per user: user_id -> {filter tuple: JSON bytes}
+_reminder_list_cache = TTLCache(maxsize=10000, ttl=30)
+
+def invalidate_reminder_lists(user_id: str):
+    """Drop every cached reminder listing for the given user"""
+    _reminder_list_cache.pop(user_id, None)
+
+def _reminder_from_doc(doc: Dict[str, Any]) -> Reminder:
+    """Build a Reminder from a stored document without re-validating it"""
+    return Reminder.model_construct(
+        id=str(doc["_id"]),
+        title=doc["title"],
+        description=doc.get("description"),
+        due_date=doc.get("due_date"),
+        priority=doc["priority"],
+        tags=doc.get("tags", []),
+        user_id=doc["user_id"],
+        project_id=doc.get("project_id"),
+        related_document_id=doc.get("related_document_id"),
+        status=doc["status"],
+        apple_reminder_id=doc.get("apple_reminder_id"),
+        completed_at=doc.get("completed_at"),
+        created_at=doc["created_at"],
+        updated_at=doc["updated_at"],
+        synced_at=doc.get("synced_at")
+    )
+
+async def get_reminders_with_projects(query: Dict[str, Any], skip: int, limit: int) -> List[Dict[str, Any]]:
+    """Fetch a page of reminders with each one's project title and color joined in one round trip"""
+    collection = MongoDB.get_collection("reminders")
+    pipeline = [
+        {"$match": query},
+        {"$sort": {"due_date": 1}},
+        {"$skip": skip},
+        {"$limit": limit},
+        {"$project": {**REMINDER_PROJECTION, "_id": 1}},
+        {"$lookup": {
+            "from": "projects",
+            # project_id is stored as a string; convert it to match the projects' ObjectId keys
+            "let": {"project_oid": {"$convert": {"input": "$project_id", "to": "objectId", "onError": None, "onNull": None}}},
+            "pipeline": [
+                {"$match": {"$expr": {"$eq": ["$_id", "$$project_oid"]}}},
+                {"$project": {"title": 1, "color": 1}}
+            ],
+            "as": "project"
+        }},
+        {"$unwind": {"path": "$project", "preserveNullAndEmptyArrays": True}}
+    ]
+    return await collection.aggregate(pipeline).to_list(length=limit)
+
+async def _sync_created_reminder(apple_service: AppleRemindersService, reminder_id: ObjectId, reminder_data: Dict[str, Any]):
+    """Background task to push a new reminder to Apple Reminders"""
+    try:
+        apple_reminder_id = await apple_service.create_reminder(reminder_data)
+        if apple_reminder_id:
+            collection = MongoDB.get_collection("reminders")
+            await collection.update_one(
+                {"_id": reminder_id},
+                {"$set": {"apple_reminder_id": apple_reminder_id, "synced_at": datetime.utcnow()}}
+            )
+            invalidate_reminder_lists(reminder_data["user_id"])
+    except Exception as e:
+        logger.warning(f"Failed to sync with Apple Reminders: {e}")
+
+async def _sync_updated_reminder(
+    apple_service: AppleRemindersService,
+    reminder_id: ObjectId,
+    apple_reminder_id: str,
+    update_data: Dict[str, Any],
+    user_id: str
+):
+    """Background task to push reminder changes to Apple Reminders"""
+    try:
+        await apple_service.update_reminder(apple_reminder_id, update_data)
+        collection = MongoDB.get_collection("reminders")
+        await collection.update_one(
+            {"_id": reminder_id},
+            {"$set": {"synced_at": datetime.utcnow()}}
+        )
+        invalidate_reminder_lists(user_id)
+    except Exception as e:
+        logger.warning(f"Failed to sync update with Apple Reminders: {e}")
+
+async def _sync_deleted_reminder(apple_service: AppleRemindersService, apple_reminder_id: str):
+    """Background task to remove a reminder from Apple Reminders"""
+    try:
+        await apple_service.delete_reminder(apple_reminder_id)
+    except Exception as e:
+        logger.warning(f"Failed to delete from Apple Reminders: {e}")
+
 @router.post("/", response_model=Reminder)
 async def create_reminder(
     reminder: ReminderCreate,
+    background_tasks: BackgroundTasks,
+    apple_service: AppleRemindersService = Depends(get_apple_reminders_service),
     current_user: User = Depends(get_current_user)
 ):
     """Create a new reminder"""
@@ -31,40 +141,14 @@ async def create_reminder(
         # Insert reminder
         result = await collection.insert_one(reminder_doc.dict(by_alias=True, exclude={"id"}))
         
-        # Sync with Apple Reminders if enabled
-        apple_service = AppleRemindersService()
-        try:
-            apple_reminder_id = await apple_service.create_reminder(reminder_doc)
-            if apple_reminder_id:
-                await collection.update_one(
-                    {"_id": result.inserted_id},
-                    {"$set": {"apple_reminder_id": apple_reminder_id, "synced_at": datetime.utcnow()}}
-                )
-        except Exception as e:
-            logger.warning(f"Failed to sync with Apple Reminders: {e}")
-        
-        # Get created reminder
-        created_doc = await collection.find_one({"_id": result.inserted_id})
+        # Sync with Apple Reminders after the response is sent
+        background_tasks.add_task(_sync_created_reminder, apple_service, result.inserted_id, reminder_doc.dict())
         
+        invalidate_reminder_lists(current_user.id)
+        invalidate_search_results(current_user.id)
         logger.info(f"Reminder created: {reminder.title} by {current_user.username}")
         
-        return Reminder(
-            id=str(created_doc["_id"]),
-            title=created_doc["title"],
-            description=created_doc.get("description"),
-            due_date=created_doc.get("due_date"),
-            priority=created_doc["priority"],
-            tags=created_doc.get("tags", []),
-            user_id=created_doc["user_id"],
-            project_id=created_doc.get("project_id"),
-            related_document_id=created_doc.get("related_document_id"),
-            status=created_doc["status"],
-            apple_reminder_id=created_doc.get("apple_reminder_id"),
-            completed_at=created_doc.get("completed_at"),
-            created_at=created_doc["created_at"],
-            updated_at=created_doc["updated_at"],
-            synced_at=created_doc.get("synced_at")
-        )
+        return _reminder_from_doc({**reminder_doc.dict(exclude={"id"}), "_id": result.inserted_id})
         
     except Exception as e:
         logger.error(f"Reminder creation failed: {e}")
@@ -73,18 +157,30 @@ async def create_reminder(
             detail="Failed to create reminder"
         )
 
-@router.get("/", response_model=List[Reminder])
+@router.get("/", response_model=ReminderPage)
 async def get_reminders(
     status: Optional[ReminderStatus] = None,
     priority: Optional[ReminderPriority] = None,
     project_id: Optional[str] = None,
     due_before: Optional[date] = None,
+    after: Optional[str] = None,  # next_after from the previous page
     skip: int = 0,
     limit: int = 100,
     current_user: User = Depends(get_current_user)
 ):
     """Get reminders"""
     try:
+        if after and skip:
+            raise HTTPException(
+                status_code=HTTP_400_BAD_REQUEST,
+                detail="Use either skip or after, not both"
+            )
+        
+        cache_key = (status, priority, project_id, due_before, after, skip, limit)
+        user_lists = _reminder_list_cache.get(current_user.id)
+        if user_lists is not None and cache_key in user_lists:
+            return Response(content=user_lists[cache_key], media_type="application/json")
+        
         collection = MongoDB.get_collection("reminders")
         
         # Build query
@@ -100,37 +196,46 @@ async def get_reminders(
             query["project_id"] = project_id
         
         if due_before:
-            query["due_date"] = {"$lte": datetime.combine(due_before, datetime.max.time())}
+            query["due_date"] = {"$lte": datetime.combine(due_before, _MAX_TIME)}
+        
+        # Keyset pagination seeks straight to the page instead of walking past `skip` entries;
+        # undated reminders sort first and are paged through by _id
+        if after:
+            try:
+                after_value, after_id = decode_cursor(after)
+            except ValueError:
+                raise HTTPException(
+                    status_code=HTTP_400_BAD_REQUEST,
+                    detail="Invalid cursor"
+                )
+            query.update(keyset_filter("due_date", after_value, after_id, 1))
         
         # Get reminders
-        cursor = collection.find(query).sort("due_date", 1).skip(skip).limit(limit)
-        reminders = await cursor.to_list(length=limit)
-        
-        return [
-            Reminder(
-                id=str(doc["_id"]),
-                title=doc["title"],
-                description=doc.get("description"),
-                due_date=doc.get("due_date"),
-                priority=doc["priority"],
-                tags=doc.get("tags", []),
-                user_id=doc["user_id"],
-                project_id=doc.get("project_id"),
-                related_document_id=doc.get("related_document_id"),
-                status=doc["status"],
-                apple_reminder_id=doc.get("apple_reminder_id"),
-                completed_at=doc.get("completed_at"),
-                created_at=doc["created_at"],
-                updated_at=doc["updated_at"],
-                synced_at=doc.get("synced_at")
-            )
-            for doc in reminders
-        ]
+        cursor = (
+            collection.find(query, REMINDER_PROJECTION)
+            .sort([("due_date", 1), ("_id", 1)])
+            .skip(skip)
+            .limit(limit)
+        )
+        items = []
+        last_doc = None
+        async for last_doc in cursor:
+            items.append(_reminder_from_doc(last_doc).fast_dump())
+        next_after = None
+        if last_doc is not None and len(items) == limit:
+            next_after = encode_cursor(last_doc.get("due_date"), last_doc["_id"])
+        
+        # Serialize once with orjson; response_model still documents the schema but skips re-validating every row
+        body = orjson.dumps({"items": items, "next_after": next_after})
+        _reminder_list_cache.setdefault(current_user.id, {})[cache_key] = body
+        return Response(content=body, media_type="application/json")
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Failed to get reminders: {e}")
         raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            status_code=HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Failed to retrieve reminders"
         )
 
@@ -141,7 +246,9 @@ async def get_reminder(
 ):
     """Get a specific reminder"""
     try:
-        if not ObjectId.is_valid(reminder_id):
+        try:
+            reminder_oid = ObjectId(reminder_id)
+        except InvalidId:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Invalid reminder ID"
@@ -149,9 +256,9 @@ async def get_reminder(
         
         collection = MongoDB.get_collection("reminders")
         doc = await collection.find_one({
-            "_id": ObjectId(reminder_id),
+            "_id": reminder_oid,
             "user_id": current_user.id
-        })
+        }, REMINDER_PROJECTION)
         
         if not doc:
             raise HTTPException(
@@ -159,23 +266,7 @@ async def get_reminder(
                 detail="Reminder not found"
             )
         
-        return Reminder(
-            id=str(doc["_id"]),
-            title=doc["title"],
-            description=doc.get("description"),
-            due_date=doc.get("due_date"),
-            priority=doc["priority"],
-            tags=doc.get("tags", []),
-            user_id=doc["user_id"],
-            project_id=doc.get("project_id"),
-            related_document_id=doc.get("related_document_id"),
-            status=doc["status"],
-            apple_reminder_id=doc.get("apple_reminder_id"),
-            completed_at=doc.get("completed_at"),
-            created_at=doc["created_at"],
-            updated_at=doc["updated_at"],
-            synced_at=doc.get("synced_at")
-        )
+        return _reminder_from_doc(doc)
         
     except HTTPException:
         raise
@@ -190,84 +281,69 @@ async def get_reminder(
 async def update_reminder(
     reminder_id: str,
     reminder_update: ReminderUpdate,
+    background_tasks: BackgroundTasks,
+    apple_service: AppleRemindersService = Depends(get_apple_reminders_service),
     current_user: User = Depends(get_current_user)
 ):
     """Update a reminder"""
     try:
-        if not ObjectId.is_valid(reminder_id):
+        try:
+            reminder_oid = ObjectId(reminder_id)
+        except InvalidId:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Invalid reminder ID"
             )
         
         collection = MongoDB.get_collection("reminders")
+        reminder_filter = {"_id": reminder_oid, "user_id": current_user.id}
         
-        # Check if reminder exists and belongs to user
-        existing = await collection.find_one({
-            "_id": ObjectId(reminder_id),
-            "user_id": current_user.id
-        })
+        # Prepare update data
+        update_data = reminder_update.model_dump(exclude_unset=True, exclude_none=True)
+        
+        update_data["updated_at"] = datetime.utcnow()
+        
+        # Handle completion; an already completed reminder keeps its original completion time
+        if update_data.get("status") == ReminderStatus.COMPLETED:
+            update_data.pop("completed_at", None)
+            update = [{"$set": {
+                **{field: {"$literal": value} for field, value in update_data.items()},
+                "completed_at": {"$ifNull": ["$completed_at", update_data["updated_at"]]}
+            }}]
+        else:
+            update_data["completed_at"] = None
+            update = {"$set": update_data}
+        
+        # Ownership check, update and re-read in a single round trip
+        updated_doc = await collection.find_one_and_update(
+            reminder_filter,
+            update,
+            projection=REMINDER_PROJECTION,
+            return_document=ReturnDocument.AFTER
+        )
         
-        if not existing:
+        if not updated_doc:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Reminder not found"
             )
         
-        # Prepare update data
-        update_data = {}
-        for field, value in reminder_update.dict(exclude_unset=True).items():
-            if value is not None:
-                update_data[field] = value
-        
-        # Handle completion
-        if update_data.get("status") == ReminderStatus.COMPLETED and not existing.get("completed_at"):
-            update_data["completed_at"] = datetime.utcnow()
-        elif update_data.get("status") != ReminderStatus.COMPLETED:
-            update_data["completed_at"] = None
-        
-        if update_data:
-            update_data["updated_at"] = datetime.utcnow()
-            await collection.update_one(
-                {"_id": ObjectId(reminder_id)},
-                {"$set": update_data}
+        # Sync with Apple Reminders after the response is sent
+        if updated_doc.get("apple_reminder_id"):
+            background_tasks.add_task(
+                _sync_updated_reminder,
+                apple_service,
+                updated_doc["_id"],
+                updated_doc["apple_reminder_id"],
+                update_data,
+                current_user.id
             )
-            
-            # Sync with Apple Reminders if enabled
-            apple_service = AppleRemindersService()
-            try:
-                if existing.get("apple_reminder_id"):
-                    await apple_service.update_reminder(existing["apple_reminder_id"], update_data)
-                    update_data["synced_at"] = datetime.utcnow()
-                    await collection.update_one(
-                        {"_id": ObjectId(reminder_id)},
-                        {"$set": {"synced_at": update_data["synced_at"]}}
-                    )
-            except Exception as e:
-                logger.warning(f"Failed to sync update with Apple Reminders: {e}")
-        
-        # Return updated reminder
-        updated_doc = await collection.find_one({"_id": ObjectId(reminder_id)})
         
+        invalidate_reminder_lists(current_user.id)
+        invalidate_search_results(current_user.id)
         logger.info(f"Reminder updated: {reminder_id} by {current_user.username}")
         
-        return Reminder(
-            id=str(updated_doc["_id"]),
-            title=updated_doc["title"],
-            description=updated_doc.get("description"),
-            due_date=updated_doc.get("due_date"),
-            priority=updated_doc["priority"],
-            tags=updated_doc.get("tags", []),
-            user_id=updated_doc["user_id"],
-            project_id=updated_doc.get("project_id"),
-            related_document_id=updated_doc.get("related_document_id"),
-            status=updated_doc["status"],
-            apple_reminder_id=updated_doc.get("apple_reminder_id"),
-            completed_at=updated_doc.get("completed_at"),
-            created_at=updated_doc["created_at"],
-            updated_at=updated_doc["updated_at"],
-            synced_at=updated_doc.get("synced_at")
-        )
+        return _reminder_from_doc(updated_doc)
         
     except HTTPException:
         raise
@@ -281,11 +357,15 @@ async def update_reminder(
 @router.delete("/{reminder_id}")
 async def delete_reminder(
     reminder_id: str,
+    background_tasks: BackgroundTasks,
+    apple_service: AppleRemindersService = Depends(get_apple_reminders_service),
     current_user: User = Depends(get_current_user)
 ):
     """Delete a reminder"""
     try:
-        if not ObjectId.is_valid(reminder_id):
+        try:
+            reminder_oid = ObjectId(reminder_id)
+        except InvalidId:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Invalid reminder ID"
@@ -293,11 +373,11 @@ async def delete_reminder(
         
         collection = MongoDB.get_collection("reminders")
         
-        # Check if reminder exists and belongs to user
-        existing = await collection.find_one({
-            "_id": ObjectId(reminder_id),
-            "user_id": current_user.id
-        })
+        # Ownership check and delete in a single round trip
+        existing = await collection.find_one_and_delete(
+            {"_id": reminder_oid, "user_id": current_user.id},
+            projection={"apple_reminder_id": 1}
+        )
         
         if not existing:
             raise HTTPException(
@@ -305,17 +385,12 @@ async def delete_reminder(
                 detail="Reminder not found"
             )
         
-        # Delete from Apple Reminders if synced
+        # Delete from Apple Reminders after the response is sent
         if existing.get("apple_reminder_id"):
-            apple_service = AppleRemindersService()
-            try:
-                await apple_service.delete_reminder(existing["apple_reminder_id"])
-            except Exception as e:
-                logger.warning(f"Failed to delete from Apple Reminders: {e}")
-        
-        # Delete reminder
-        await collection.delete_one({"_id": ObjectId(reminder_id)})
+            background_tasks.add_task(_sync_deleted_reminder, apple_service, existing["apple_reminder_id"])
         
+        invalidate_reminder_lists(current_user.id)
+        invalidate_search_results(current_user.id)
         logger.info(f"Reminder deleted: {reminder_id} by {current_user.username}")
         
         return {"message": "Reminder deleted successfully"}
@@ -332,16 +407,60 @@ async def delete_reminder(
 @router.post("/{reminder_id}/complete", response_model=Reminder)
 async def complete_reminder(
     reminder_id: str,
+    background_tasks: BackgroundTasks,
+    apple_service: AppleRemindersService = Depends(get_apple_reminders_service),
     current_user: User = Depends(get_current_user)
 ):
     """Mark a reminder as completed"""
     try:
-        return await update_reminder(
-            reminder_id,
-            ReminderUpdate(status=ReminderStatus.COMPLETED),
-            current_user
+        try:
+            reminder_oid = ObjectId(reminder_id)
+        except InvalidId:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Invalid reminder ID"
+            )
+        
+        collection = MongoDB.get_collection("reminders")
+        now = datetime.utcnow()
+        
+        # An already completed reminder keeps its original completion time
+        updated_doc = await collection.find_one_and_update(
+            {"_id": reminder_oid, "user_id": current_user.id},
+            [{"$set": {
+                "status": ReminderStatus.COMPLETED.value,
+                "completed_at": {"$ifNull": ["$completed_at", now]},
+                "updated_at": now
+            }}],
+            projection=REMINDER_PROJECTION,
+            return_document=ReturnDocument.AFTER
         )
         
+        if not updated_doc:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Reminder not found"
+            )
+        
+        # Sync with Apple Reminders after the response is sent
+        if updated_doc.get("apple_reminder_id"):
+            background_tasks.add_task(
+                _sync_updated_reminder,
+                apple_service,
+                reminder_oid,
+                updated_doc["apple_reminder_id"],
+                {"status": ReminderStatus.COMPLETED, "completed_at": updated_doc["completed_at"], "updated_at": now},
+                current_user.id
+            )
+        
+        invalidate_reminder_lists(current_user.id)
+        invalidate_search_results(current_user.id)
+        logger.info(f"Reminder completed: {reminder_id} by {current_user.username}")
+        
+        return _reminder_from_doc(updated_doc)
+        
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Failed to complete reminder: {e}")
         raise HTTPException(
@@ -351,12 +470,29 @@ async def complete_reminder(
 
 @router.post("/sync")
 async def sync_reminders(
+    apple_service: AppleRemindersService = Depends(get_apple_reminders_service),
     current_user: User = Depends(get_current_user)
 ):
     """Sync with Apple Reminders"""
     try:
-        apple_service = AppleRemindersService()
-        result = await apple_service.sync_reminders(current_user.id)
+        collection = MongoDB.get_collection("reminders")
+        
+        # Reminders never pushed to Apple go over in one round trip
+        pending = await collection.find(
+            {"user_id": current_user.id, "apple_reminder_id": None},
+            {"title": 1, "description": 1, "due_date": 1, "priority": 1}
+        ).to_list(length=None)
+        
+        result = await apple_service.sync_reminders(current_user.id, pending)
+        
+        # Mark only the reminders Apple confirmed, so failed ones are retried next sync
+        synced_ids = result.pop("synced_ids", [])
+        if synced_ids:
+            await collection.update_many(
+                {"_id": {"$in": synced_ids}},
+                {"$set": {"apple_reminder_id": "apple_reminder_created", "synced_at": datetime.utcnow()}}
+            )
+            invalidate_reminder_lists(current_user.id)
         
         logger.info(f"Reminders sync completed for user {current_user.username}")
         
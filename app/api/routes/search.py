@@ -1,16 +1,46 @@
 from fastapi import APIRouter, HTTPException, Depends, status
 from typing import List, Dict, Any, Optional
+import asyncio
 import logging
+import re
 from datetime import datetime
+from cachetools import TTLCache
 
 from app.models.user import User
 from app.api.routes.auth import get_current_user
 from app.core.database import MongoDB
 from app.core.memory_store import MemoryStore
+from app.core.responses import AppJSONResponse
+from app.core.search_versions import search_version
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
+# Relevance of a $text match, used to rank results
+TEXT_SCORE = {"$meta": "textScore"}
+
+# Only the fields each search result is built from, plus the relevance score
+PROJECT_SEARCH_PROJECTION = {
+    "score": TEXT_SCORE, "title": 1, "description": 1, "tags": 1, "document_count": 1,
+    "created_at": 1, "updated_at": 1
+}
+EVENT_SEARCH_PROJECTION = {
+    "score": TEXT_SCORE, "title": 1, "description": 1, "start_date": 1, "end_date": 1,
+    "location": 1, "created_at": 1
+}
+REMINDER_SEARCH_PROJECTION = {
+    "score": TEXT_SCORE, "title": 1, "description": 1, "due_date": 1, "priority": 1,
+    "status": 1, "created_at": 1
+}
+
+# Short-lived per-user result caches; keys carry the user's write version so any
+# write to searchable content makes that user's older entries unreachable
+_search_cache = TTLCache(maxsize=10_000, ttl=30)
+_suggestion_cache = TTLCache(maxsize=10_000, ttl=5)
+
+def _search_cache_key(user_id: str, collection: str, query: str, limit: int) -> tuple:
+    return (user_id, search_version(user_id), collection, query, limit)
+
 @router.get("/")
 async def unified_search(
     query: str,
@@ -20,32 +50,29 @@ async def unified_search(
 ):
     """Unified search across all content types"""
     try:
-        results = {}
-        
-        if search_type in ["all", "documents"]:
-            results["documents"] = await search_documents(query, current_user.id, limit)
-        
-        if search_type in ["all", "projects"]:
-            results["projects"] = await search_projects(query, current_user.id, limit)
-        
-        if search_type in ["all", "events"]:
-            results["events"] = await search_calendar_events(query, current_user.id, limit)
-        
-        if search_type in ["all", "reminders"]:
-            results["reminders"] = await search_reminders(query, current_user.id, limit)
-        
-        if search_type in ["all", "memories"]:
-            results["memories"] = await search_memories(query, current_user.id, limit)
+        tasks = {
+            key: _SEARCH_HANDLERS[key](query, current_user.id, limit)
+            for key in _TYPE_GROUPS.get(search_type, ())
+        }
         
-        # Calculate total results
-        total_results = sum(len(results.get(key, [])) for key in results)
+        # Run the sub-searches concurrently so latency is the slowest one, not the sum;
+        # results are collected and counted in the same pass
+        results = {}
+        total_results = 0
+        done = await asyncio.gather(*tasks.values(), return_exceptions=True)
+        for key, result in zip(tasks, done):
+            if isinstance(result, Exception):
+                logger.error(f"Search of {key} failed: {result}")
+                result = []
+            results[key] = result
+            total_results += len(result)
         
-        return {
+        return AppJSONResponse({
             "query": query,
             "search_type": search_type,
             "total_results": total_results,
             "results": results
-        }
+        })
         
     except Exception as e:
         logger.error(f"Unified search failed: {e}")
@@ -56,21 +83,34 @@ async def unified_search(
 
 async def search_documents(query: str, user_id: str, limit: int) -> List[Dict[str, Any]]:
     """Search documents"""
+    cache_key = _search_cache_key(user_id, "documents", query, limit)
+    cached = _search_cache.get(cache_key)
+    if cached is not None:
+        return cached
+    
     try:
         collection = MongoDB.get_collection("documents")
-        cursor = collection.find({
-            "user_id": user_id,
-            "$text": {"$search": query}
-        }).limit(limit)
+        
+        # Full bodies never cross the wire; the preview is stored at write time
+        cursor = collection.aggregate([
+            {"$match": {"user_id": user_id, "$text": {"$search": query}}},
+            {"$sort": {"score": TEXT_SCORE}},
+            {"$limit": limit},
+            {"$project": {
+                "title": 1, "document_type": 1, "project_id": 1,
+                "created_at": 1, "updated_at": 1,
+                "content_preview": 1
+            }}
+        ], batchSize=limit)
         
         documents = await cursor.to_list(length=limit)
         
-        return [
+        results = [
             {
                 "id": str(doc["_id"]),
                 "type": "document",
                 "title": doc["title"],
-                "content_preview": doc.get("content", "")[:200] + "..." if doc.get("content") else "",
+                "content_preview": doc.get("content_preview", ""),
                 "document_type": doc.get("document_type"),
                 "project_id": doc.get("project_id"),
                 "created_at": doc["created_at"],
@@ -78,6 +118,8 @@ async def search_documents(query: str, user_id: str, limit: int) -> List[Dict[st
             }
             for doc in documents
         ]
+        _search_cache[cache_key] = results
+        return results
         
     except Exception as e:
         logger.error(f"Document search failed: {e}")
@@ -85,16 +127,21 @@ async def search_documents(query: str, user_id: str, limit: int) -> List[Dict[st
 
 async def search_projects(query: str, user_id: str, limit: int) -> List[Dict[str, Any]]:
     """Search projects"""
+    cache_key = _search_cache_key(user_id, "projects", query, limit)
+    cached = _search_cache.get(cache_key)
+    if cached is not None:
+        return cached
+    
     try:
         collection = MongoDB.get_collection("projects")
         cursor = collection.find({
             "user_id": user_id,
             "$text": {"$search": query}
-        }).limit(limit)
+        }, PROJECT_SEARCH_PROJECTION).sort([("score", TEXT_SCORE)]).limit(limit).batch_size(limit)
         
         projects = await cursor.to_list(length=limit)
         
-        return [
+        results = [
             {
                 "id": str(doc["_id"]),
                 "type": "project",
@@ -107,6 +154,8 @@ async def search_projects(query: str, user_id: str, limit: int) -> List[Dict[str
             }
             for doc in projects
         ]
+        _search_cache[cache_key] = results
+        return results
         
     except Exception as e:
         logger.error(f"Project search failed: {e}")
@@ -114,16 +163,21 @@ async def search_projects(query: str, user_id: str, limit: int) -> List[Dict[str
 
 async def search_calendar_events(query: str, user_id: str, limit: int) -> List[Dict[str, Any]]:
     """Search calendar events"""
+    cache_key = _search_cache_key(user_id, "calendar_events", query, limit)
+    cached = _search_cache.get(cache_key)
+    if cached is not None:
+        return cached
+    
     try:
         collection = MongoDB.get_collection("calendar_events")
         cursor = collection.find({
             "user_id": user_id,
             "$text": {"$search": query}
-        }).limit(limit)
+        }, EVENT_SEARCH_PROJECTION).sort([("score", TEXT_SCORE)]).limit(limit).batch_size(limit)
         
         events = await cursor.to_list(length=limit)
         
-        return [
+        results = [
             {
                 "id": str(doc["_id"]),
                 "type": "calendar_event",
@@ -136,6 +190,8 @@ async def search_calendar_events(query: str, user_id: str, limit: int) -> List[D
             }
             for doc in events
         ]
+        _search_cache[cache_key] = results
+        return results
         
     except Exception as e:
         logger.error(f"Calendar event search failed: {e}")
@@ -143,16 +199,21 @@ async def search_calendar_events(query: str, user_id: str, limit: int) -> List[D
 
 async def search_reminders(query: str, user_id: str, limit: int) -> List[Dict[str, Any]]:
     """Search reminders"""
+    cache_key = _search_cache_key(user_id, "reminders", query, limit)
+    cached = _search_cache.get(cache_key)
+    if cached is not None:
+        return cached
+    
     try:
         collection = MongoDB.get_collection("reminders")
         cursor = collection.find({
             "user_id": user_id,
             "$text": {"$search": query}
-        }).limit(limit)
+        }, REMINDER_SEARCH_PROJECTION).sort([("score", TEXT_SCORE)]).limit(limit).batch_size(limit)
         
         reminders = await cursor.to_list(length=limit)
         
-        return [
+        results = [
             {
                 "id": str(doc["_id"]),
                 "type": "reminder",
@@ -165,6 +226,8 @@ async def search_reminders(query: str, user_id: str, limit: int) -> List[Dict[st
             }
             for doc in reminders
         ]
+        _search_cache[cache_key] = results
+        return results
         
     except Exception as e:
         logger.error(f"Reminder search failed: {e}")
@@ -172,25 +235,54 @@ async def search_reminders(query: str, user_id: str, limit: int) -> List[Dict[st
 
 async def search_memories(query: str, user_id: str, limit: int) -> List[Dict[str, Any]]:
     """Search memories using the memory store"""
+    cache_key = _search_cache_key(user_id, "memories", query, limit)
+    cached = _search_cache.get(cache_key)
+    if cached is not None:
+        return cached
+    
     try:
-        memories = await MemoryStore.search_memories(user_id, query, limit)
+        memories = await MemoryStore.search_memories(user_id, query, limit, preview=True)
         
-        return [
+        results = [
             {
                 "id": memory["id"],
                 "type": "memory",
-                "content": memory["content"][:200] + "..." if len(memory["content"]) > 200 else memory["content"],
+                "content": memory["content"],
                 "entities": memory.get("entities", []),
                 "metadata": memory.get("metadata", {}),
                 "created_at": memory["created_at"]
             }
             for memory in memories
         ]
+        _search_cache[cache_key] = results
+        return results
         
     except Exception as e:
         logger.error(f"Memory search failed: {e}")
         return []
 
+# Result key -> search helper, and the keys each search_type expands to
+_SEARCH_HANDLERS = {
+    "documents": search_documents,
+    "projects": search_projects,
+    "events": search_calendar_events,
+    "reminders": search_reminders,
+    "memories": search_memories
+}
+_TYPE_GROUPS = {
+    "all": tuple(_SEARCH_HANDLERS),
+    **{key: (key,) for key in _SEARCH_HANDLERS}
+}
+
+def _suggestion_projection(suggestion_type: str) -> Dict[str, Any]:
+    """Shape a title match into a suggestion on the server"""
+    return {
+        "_id": 0,
+        "text": "$title",
+        "type": {"$literal": suggestion_type},
+        "id": {"$toString": "$_id"}
+    }
+
 @router.get("/suggestions")
 async def get_search_suggestions(
     query: str,
@@ -201,41 +293,52 @@ async def get_search_suggestions(
         suggestions = []
         
         # Get recent documents, projects, etc. that match the partial query
-        if len(query) >= 2:
-            # Search documents
+        cache_key = (current_user.id, search_version(current_user.id), query.lower())
+        cached = _suggestion_cache.get(cache_key)
+        if cached is not None:
+            suggestions = cached
+        elif len(query) >= 2:
             doc_collection = MongoDB.get_collection("documents")
-            doc_cursor = doc_collection.find({
+            # Anchored, case-sensitive prefix on the lower-cased title so the
+            # (user_id, title_lower) index bounds the scan
+            query_lower = " ".join(query.lower().split())
+            title_filter = {
                 "user_id": current_user.id,
-                "title": {"$regex": query, "$options": "i"}
-            }).limit(5)
-            docs = await doc_cursor.to_list(length=5)
-            
-            for doc in docs:
-                suggestions.append({
-                    "text": doc["title"],
-                    "type": "document",
-                    "id": str(doc["_id"])
-                })
+                "title_lower": {"$regex": f"^{re.escape(query_lower)}"}
+            }
             
-            # Search projects
-            proj_collection = MongoDB.get_collection("projects")
-            proj_cursor = proj_collection.find({
-                "user_id": current_user.id,
-                "title": {"$regex": query, "$options": "i"}
-            }).limit(5)
-            projects = await proj_cursor.to_list(length=5)
+            # Multi-word queries also probe the precomputed phrases, which
+            # catches matches in the middle of a title
+            if " " in query_lower:
+                title_filter = {
+                    "user_id": current_user.id,
+                    "$or": [
+                        {"title_lower": title_filter["title_lower"]},
+                        {"title_phrases": query_lower}
+                    ]
+                }
             
-            for proj in projects:
-                suggestions.append({
-                    "text": proj["title"],
-                    "type": "project",
-                    "id": str(proj["_id"])
-                })
+            # Documents and projects in a single round trip
+            cursor = doc_collection.aggregate([
+                {"$match": title_filter},
+                {"$limit": 5},
+                {"$project": _suggestion_projection("document")},
+                {"$unionWith": {
+                    "coll": "projects",
+                    "pipeline": [
+                        {"$match": title_filter},
+                        {"$limit": 5},
+                        {"$project": _suggestion_projection("project")}
+                    ]
+                }}
+            ])
+            suggestions = await cursor.to_list(length=10)
+            _suggestion_cache[cache_key] = suggestions
         
-        return {
+        return AppJSONResponse({
             "query": query,
             "suggestions": suggestions[:10]  # Limit to 10 suggestions
-        }
+        })
         
     except Exception as e:
         logger.error(f"Search suggestions failed: {e}")
@@ -257,10 +360,13 @@ async def search_entities(
         if entity_type:
             query["entity_type"] = entity_type
         
-        cursor = collection.find(query).sort("mention_count", -1).limit(50)
-        entities = await cursor.to_list(length=50)
+        # Leave the mentions history on the server; one batch holds the whole page
+        cursor = collection.find(
+            query,
+            {"entity_name": 1, "entity_type": 1, "mention_count": 1, "updated_at": 1}
+        ).sort("mention_count", -1).limit(50).batch_size(50)
         
-        return {
+        return AppJSONResponse({
             "entity_type": entity_type,
             "entities": [
                 {
@@ -269,9 +375,9 @@ async def search_entities(
                     "mention_count": entity["mention_count"],
                     "last_updated": entity["updated_at"]
                 }
-                for entity in entities
+                async for entity in cursor
             ]
-        }
+        })
         
     except Exception as e:
         logger.error(f"Entity search failed: {e}")
@@ -0,0 +1,27 @@
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Optional
+
+# Timestamp taken once when a request starts; model defaults share it
+_request_now: ContextVar[Optional[datetime]] = ContextVar("request_now", default=None)
+
+def utcnow() -> datetime:
+    """Current request's start time, or the wall clock outside a request"""
+    return _request_now.get() or datetime.utcnow()
+
+class RequestClockMiddleware:
+    """ASGI middleware that stamps each HTTP request with a single utcnow()"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        token = _request_now.set(datetime.utcnow())
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _request_now.reset(token)
@@ -1,5 +1,5 @@
 from pydantic_settings import BaseSettings
-from typing import Optional
+from typing import Optional, List
 import os
 
 class Settings(BaseSettings):
@@ -11,9 +11,17 @@ class Settings(BaseSettings):
     # Database settings
     mongodb_url: str = os.getenv("MONGODB_URL", "mongodb://localhost:27017")
     mongodb_db_name: str = os.getenv("MONGODB_DB_NAME", "second_brain")
+    mongodb_max_pool_size: int = 200  # unified search fans out to 5 concurrent queries
+    mongodb_min_pool_size: int = 20
+    mongodb_max_idle_time_ms: int = 60000
+    mongodb_wait_queue_timeout_ms: int = 2000
+    mongodb_server_selection_timeout_ms: int = 3000
+    mongodb_connect_timeout_ms: int = 3000
+    mongodb_compressors: str = "zstd,zlib"
     
     # Memory store settings
     mem0_api_key: Optional[str] = os.getenv("MEM0_API_KEY")
+    spacy_model: str = os.getenv("SPACY_MODEL", "en_core_web_sm")
     
     # AI settings
     voyage_api_key: Optional[str] = os.getenv("VOYAGE_API_KEY")
@@ -23,6 +31,13 @@ class Settings(BaseSettings):
     # Security settings
     secret_key: str = os.getenv("SECRET_KEY", "your-secret-key-change-in-production")
     access_token_expire_minutes: int = 60 * 24 * 30  # 30 days
+    argon2_time_cost: int = 2
+    argon2_memory_cost: int = 19 * 1024  # KiB
+    argon2_parallelism: int = 1
+    
+    # CORS settings; set CORS_ORIGINS as a JSON list, e.g. ["https://app.example.com"]
+    cors_origins: List[str] = ["http://localhost:3000"]
+    cors_max_age: int = 86400  # seconds browsers may cache a preflight
     
     # File upload settings
     max_file_size: int = 100 * 1024 * 1024  # 100MB
@@ -1,21 +1,38 @@
 from motor.motor_asyncio import AsyncIOMotorClient
-from pymongo import IndexModel, TEXT
-from typing import Optional
+from pymongo import IndexModel, TEXT, UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError, OperationFailure
+from typing import Optional, List, Tuple, Dict, Any
+import asyncio
+from datetime import datetime
 import logging
 from .config import settings
+from .search_fields import title_search_fields
 
 logger = logging.getLogger(__name__)
 
 class MongoDB:
     client: Optional[AsyncIOMotorClient] = None
     database = None
+    _collections: Dict[str, Any] = {}
 
     @classmethod
     async def connect(cls):
         """Create database connection"""
         try:
-            cls.client = AsyncIOMotorClient(settings.mongodb_url)
+            cls.client = AsyncIOMotorClient(
+                settings.mongodb_url,
+                maxPoolSize=settings.mongodb_max_pool_size,
+                minPoolSize=settings.mongodb_min_pool_size,
+                maxIdleTimeMS=settings.mongodb_max_idle_time_ms,
+                waitQueueTimeoutMS=settings.mongodb_wait_queue_timeout_ms,
+                serverSelectionTimeoutMS=settings.mongodb_server_selection_timeout_ms,
+                connectTimeoutMS=settings.mongodb_connect_timeout_ms,
+                compressors=settings.mongodb_compressors,
+                retryReads=True,
+                retryWrites=True
+            )
             cls.database = cls.client[settings.mongodb_db_name]
+            cls._collections = {}
             
             # Test connection
             await cls.client.admin.command('ping')
@@ -33,38 +50,129 @@ class MongoDB:
         """Close database connection"""
         if cls.client:
             cls.client.close()
+            cls._collections = {}
             logger.info("✅ Disconnected from MongoDB")
 
     @classmethod
     async def create_indexes(cls):
         """Create necessary database indexes"""
         try:
-            # Users collection indexes
-            await cls.database.users.create_index("email", unique=True)
-            await cls.database.users.create_index("username", unique=True)
+            # One createIndexes command per collection, all collections in parallel.
+            # Text indexes lead with user_id so every per-user $text search is
+            # bounded to that user's entries inside the index
+            # Upload dedup is now per project; the old per-user unique index would still block it
+            await cls.drop_index_if_exists(cls.database.documents, "user_id_1_content_hash_1")
             
-            # Projects collection indexes
-            await cls.database.projects.create_index([("user_id", 1), ("name", 1)])
-            await cls.database.projects.create_index([("title", TEXT), ("description", TEXT)])
+            await asyncio.gather(
+                # Users collection indexes
+                cls.database.users.create_indexes([
+                    IndexModel("email", unique=True),
+                    IndexModel("username", unique=True)
+                ]),
+                
+                # Projects collection indexes
+                cls.database.projects.create_indexes([
+                    IndexModel([("user_id", 1), ("is_archived", 1), ("updated_at", -1), ("_id", -1)]),
+                    IndexModel([("user_id", 1), ("title_lower", 1)]),
+                    IndexModel([("user_id", 1), ("title_phrases", 1)])
+                ]),
+                cls.ensure_text_index(
+                    cls.database.projects,
+                    [("user_id", 1), ("title", TEXT), ("description", TEXT)],
+                    weights={"title": 10, "description": 5}
+                ),
+                
+                # Documents collection indexes
+                cls.database.documents.create_indexes([
+                    IndexModel([("user_id", 1), ("project_id", 1), ("document_type", 1), ("updated_at", -1)]),
+                    IndexModel([("user_id", 1), ("updated_at", -1)]),
+                    IndexModel([("user_id", 1), ("created_at", -1)]),
+                    IndexModel([("user_id", 1), ("title_lower", 1)]),
+                    IndexModel([("user_id", 1), ("title_phrases", 1)]),
+                    IndexModel(
+                        [("user_id", 1), ("project_id", 1), ("content_hash", 1)],
+                        unique=True,
+                        partialFilterExpression={"content_hash": {"$type": "string"}}
+                    )
+                ]),
+                cls.ensure_text_index(
+                    cls.database.documents,
+                    [("user_id", 1), ("title", TEXT), ("content", TEXT)],
+                    weights={"title": 10, "content": 1}
+                ),
+                
+                # Memory collection indexes
+                cls.database.memories.create_indexes([
+                    IndexModel([("user_id", 1), ("entity_type", 1)]),
+                    IndexModel("updated_at")
+                ]),
+                cls.ensure_text_index(
+                    cls.database.memories,
+                    [("user_id", 1), ("entity_name", TEXT), ("content", TEXT)]
+                ),
+                cls.ensure_entity_knowledge_indexes(),
+                cls.database.entity_mentions.create_indexes([
+                    IndexModel([("user_id", 1), ("entity_name", 1), ("entity_type", 1), ("timestamp", -1)])
+                ]),
+                
+                # Calendar events collection indexes
+                cls.database.calendar_events.create_indexes([
+                    IndexModel([("user_id", 1), ("start_date", 1)]),
+                    IndexModel([("user_id", 1), ("project_id", 1), ("start_date", 1)])
+                ]),
+                cls.ensure_text_index(
+                    cls.database.calendar_events,
+                    [("user_id", 1), ("title", TEXT), ("description", TEXT)],
+                    weights={"title": 10, "description": 5}
+                ),
+                
+                # Reminders collection indexes
+                cls.database.reminders.create_indexes([
+                    IndexModel([("user_id", 1), ("due_date", 1), ("_id", 1)]),
+                    IndexModel([("user_id", 1), ("status", 1), ("priority", 1), ("due_date", 1)]),
+                    IndexModel([("user_id", 1), ("project_id", 1), ("due_date", 1)])
+                ]),
+                cls.ensure_text_index(
+                    cls.database.reminders,
+                    [("user_id", 1), ("title", TEXT), ("description", TEXT)],
+                    weights={"title": 10, "description": 5}
+                )
+            )
             
-            # Documents collection indexes
-            await cls.database.documents.create_index([("user_id", 1), ("project_id", 1)])
-            await cls.database.documents.create_index([("title", TEXT), ("content", TEXT)])
-            await cls.database.documents.create_index("created_at")
+            # Listing indexes now end in _id for keyset pagination; drop the versions they replace
+            await asyncio.gather(
+                cls.drop_index_if_exists(cls.database.projects, "user_id_1_is_archived_1_updated_at_-1"),
+                cls.drop_index_if_exists(cls.database.reminders, "user_id_1_due_date_1")
+            )
             
-            # Memory collection indexes
-            await cls.database.memories.create_index([("user_id", 1), ("entity_type", 1)])
-            await cls.database.memories.create_index([("entity_name", TEXT), ("content", TEXT)])
-            await cls.database.memories.create_index("updated_at")
+            # Backfill the lower-cased title used for prefix suggestions on older rows
+            for collection in (cls.database.documents, cls.database.projects):
+                await collection.update_many(
+                    {"title_lower": {"$exists": False}},
+                    [{"$set": {"title_lower": {"$toLower": "$title"}}}]
+                )
             
-            # Calendar events collection indexes
-            await cls.database.calendar_events.create_index([("user_id", 1), ("start_date", 1)])
-            await cls.database.calendar_events.create_index([("title", TEXT), ("description", TEXT)])
+            # Backfill the title phrases behind mid-title suggestions; n-grams are built in Python
+            for collection in (cls.database.documents, cls.database.projects):
+                await cls.backfill_title_phrases(collection)
             
-            # Reminders collection indexes
-            await cls.database.reminders.create_index([("user_id", 1), ("due_date", 1)])
-            await cls.database.reminders.create_index([("title", TEXT), ("description", TEXT)])
-            await cls.database.reminders.create_index("completed")
+            # Backfill the normalized name used for entity lookups
+            await cls.database.entity_knowledge.update_many(
+                {"entity_name_norm": {"$exists": False}},
+                [{"$set": {"entity_name_norm": {"$trim": {"input": {"$toLower": "$entity_name"}}}}}]
+            )
+            
+            # Backfill the stored search preview on older documents and memories
+            content = {"$ifNull": ["$content", ""]}
+            for collection in (cls.database.documents, cls.database.memories):
+                await collection.update_many(
+                    {"content_preview": {"$exists": False}},
+                    [{"$set": {"content_preview": {"$cond": [
+                        {"$gt": [{"$strLenCP": content}, 200]},
+                        {"$concat": [{"$substrCP": [content, 0, 200]}, "..."]},
+                        content
+                    ]}}}]
+                )
             
             logger.info("✅ Database indexes created successfully")
             
@@ -72,12 +180,106 @@ class MongoDB:
             logger.error(f"❌ Failed to create indexes: {e}")
             raise
 
+    @classmethod
+    async def ensure_text_index(cls, collection, keys, **kwargs):
+        """Create a text index, replacing the collection's existing one if its definition changed"""
+        try:
+            await collection.create_index(keys, **kwargs)
+        except OperationFailure as e:
+            # 85/86: an index with the same name or a second text index already exists
+            if e.code not in (85, 86):
+                raise
+            async for index in collection.list_indexes():
+                if "textIndexVersion" in index:
+                    await collection.drop_index(index["name"])
+            await collection.create_index(keys, **kwargs)
+
+    @classmethod
+    async def backfill_title_phrases(cls, collection, batch_size: int = 1000):
+        """Add title search fields to rows written before title_phrases existed"""
+        operations = []
+        async for doc in collection.find({"title_phrases": {"$exists": False}}, {"title": 1}):
+            operations.append(UpdateOne({"_id": doc["_id"]}, {"$set": title_search_fields(doc.get("title") or "")}))
+            if len(operations) == batch_size:
+                await collection.bulk_write(operations, ordered=False)
+                operations = []
+        if operations:
+            await collection.bulk_write(operations, ordered=False)
+
+    @classmethod
+    async def ensure_entity_knowledge_indexes(cls):
+        """Create the entity indexes, merging duplicate entities left by older writes if needed"""
+        collection = cls.database.entity_knowledge
+        indexes = [
+            IndexModel([("user_id", 1), ("entity_name", 1), ("entity_type", 1)], unique=True),
+            IndexModel([("user_id", 1), ("entity_name_norm", 1)])
+        ]
+        try:
+            await collection.create_indexes(indexes)
+            return
+        except OperationFailure as e:
+            if e.code != 11000:
+                raise
+        
+        # Only reached once: after the merge the unique index builds and later starts return above
+        logger.warning("⚠️ Merging duplicate entity_knowledge documents before building the unique index")
+        try:
+            await cls.merge_duplicate_entities()
+            await collection.create_indexes(indexes)
+        except OperationFailure as e:
+            # Entity lookups still work without the unique index; don't block startup on it
+            logger.error(f"❌ Failed to create entity_knowledge indexes: {e}")
+
+    @classmethod
+    async def merge_duplicate_entities(cls):
+        """Fold entity_knowledge documents sharing (user_id, entity_name, entity_type) into the oldest one"""
+        collection = cls.database.entity_knowledge
+        duplicates = collection.aggregate([
+            {"$group": {
+                "_id": {"user_id": "$user_id", "entity_name": "$entity_name", "entity_type": "$entity_type"},
+                "ids": {"$push": "$_id"},
+                "count": {"$sum": 1}
+            }},
+            {"$match": {"count": {"$gt": 1}}}
+        ], allowDiskUse=True)
+        
+        async for group in duplicates:
+            docs = await collection.find({"_id": {"$in": group["ids"]}}).sort("created_at", 1).to_list(None)
+            keeper, rest = docs[0], docs[1:]
+            # The next update's $slice trims the merged mentions back to the inline limit
+            mentions = sorted(
+                (mention for doc in docs for mention in doc.get("mentions", [])),
+                key=lambda mention: mention.get("timestamp") or datetime.min
+            )
+            await collection.update_one(
+                {"_id": keeper["_id"]},
+                {"$set": {
+                    "mentions": mentions,
+                    "mention_count": sum(doc.get("mention_count", 0) for doc in docs),
+                    "updated_at": max(doc.get("updated_at") or datetime.min for doc in docs)
+                }}
+            )
+            await collection.delete_many({"_id": {"$in": [doc["_id"] for doc in rest]}})
+
+    @classmethod
+    async def drop_index_if_exists(cls, collection, name: str):
+        """Drop a superseded index, ignoring it if it or the collection is already gone"""
+        try:
+            await collection.drop_index(name)
+        except OperationFailure as e:
+            # 26: namespace not found, 27: index not found
+            if e.code not in (26, 27):
+                raise
+
     @classmethod
     def get_collection(cls, name: str):
         """Get a collection from the database"""
-        if not cls.database:
-            raise RuntimeError("Database not connected")
-        return cls.database[name]
+        collection = cls._collections.get(name)
+        if collection is None:
+            if not cls.database:
+                raise RuntimeError("Database not connected")
+            collection = cls._collections[name] = cls.database[name]
+        return collection
 
     @classmethod
     async def get_database_stats(cls):
@@ -91,4 +293,60 @@ class MongoDB:
             "objects": stats.get("objects", 0),
             "data_size": stats.get("dataSize", 0),
             "storage_size": stats.get("storageSize", 0)
-        }
\ No newline at end of file
+        }
+
+class InsertBatcher:
+    """Coalesce concurrent insert_one calls on a collection into insert_many batches"""
+
+    def __init__(self, collection_name: str, max_batch: int = 100, max_delay: float = 0.02):
+        self.collection_name = collection_name
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self._pending: List[Tuple[Dict[str, Any], asyncio.Future]] = []
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+
+    async def insert(self, document: Dict[str, Any]):
+        """Queue a document for insertion and return its inserted _id"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((document, future))
+        
+        if len(self._pending) >= self.max_batch:
+            self._schedule_flush(loop, 0)
+        elif self._flush_handle is None:
+            self._schedule_flush(loop, self.max_delay)
+        
+        return await future
+
+    def _schedule_flush(self, loop: asyncio.AbstractEventLoop, delay: float):
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+        self._flush_handle = loop.call_later(delay, lambda: asyncio.ensure_future(self._flush()))
+
+    async def _flush(self):
+        self._flush_handle = None
+        batch, self._pending = self._pending[:self.max_batch], self._pending[self.max_batch:]
+        if self._pending:
+            self._schedule_flush(asyncio.get_running_loop(), 0)
+        if not batch:
+            return
+        
+        documents = [document for document, _ in batch]
+        failed: Dict[int, Exception] = {}
+        try:
+            await MongoDB.get_collection(self.collection_name).insert_many(documents, ordered=False)
+        except BulkWriteError as e:
+            for error in e.details.get("writeErrors", []):
+                failed[error["index"]] = DuplicateKeyError(error["errmsg"], error["code"], error) \
+                    if error["code"] == 11000 else OperationFailure(error["errmsg"], error["code"], error)
+        except Exception as e:
+            failed = {index: e for index in range(len(batch))}
+        
+        # insert_many assigns _id in place before sending, so each caller gets its own id back
+        for index, (document, future) in enumerate(batch):
+            if future.done():
+                continue
+            if index in failed:
+                future.set_exception(failed[index])
+            else:
+                future.set_result(document["_id"])
@@ -1,45 +1,98 @@
 # from mem0 import Memory  # Placeholder for Mem0 integration
 # from voyage import VoyageEmbeddings  # Placeholder for Voyage AI integration
 from typing import List, Dict, Any, Optional
+import asyncio
 import logging
+import re
+from concurrent.futures import ThreadPoolExecutor
+from collections import Counter
 from datetime import datetime
 import json
+from pymongo import UpdateOne
 from .config import settings
 from .database import MongoDB
+from .search_versions import invalidate_search_results
 
 logger = logging.getLogger(__name__)
 
+# Entity extraction patterns, compiled once
+_NAME_RE = re.compile(r'\b[A-Z][a-z]+(?:\s+[A-Z][a-z]+)*\b')
+_ORG_RE = re.compile(r'\b[A-Z][a-zA-Z\s]*(?:Inc|LLC|Corp|Company|Organization)\b')
+_LOC_RE = re.compile(r'\b\w+\s+(?:City|State|Country|Street|Avenue|Road)\b', re.IGNORECASE)
+
+# Only the head of long content goes through entity extraction
+NER_MAX_CHARS = 10_000
+
+# Length of the denormalized content_preview shown in search results
+CONTENT_PREVIEW_CHARS = 200
+
+def build_content_preview(content: str) -> str:
+    """Truncated content stored alongside the full text for search listings"""
+    if len(content) > CONTENT_PREVIEW_CHARS:
+        return content[:CONTENT_PREVIEW_CHARS] + "..."
+    return content
+
+# Mentions kept inline on an entity; the full history lives in entity_mentions
+ENTITY_MENTIONS_KEPT = 100
+
+# spaCy labels mapped onto the entity types stored in entity_knowledge
+_SPACY_ENTITY_TYPES = {
+    "PERSON": "person",
+    "ORG": "organization",
+    "GPE": "location",
+    "LOC": "location",
+    "FAC": "location"
+}
+
 class MemoryStore:
-    _instance = None
     mem0_client = None
     voyage_embeddings = None
-
-    def __new__(cls):
-        if cls._instance is None:
-            cls._instance = super().__new__(cls)
-        return cls._instance
+    nlp = None
+    _ner_pool: Optional[ThreadPoolExecutor] = None
+    _init_lock = asyncio.Lock()
+    _initialized = False
 
     @classmethod
     async def initialize(cls):
         """Initialize Mem0 and Voyage AI clients"""
-        try:
-            # Initialize Mem0 (placeholder)
-            if settings.mem0_api_key:
-                # cls.mem0_client = Memory(api_key=settings.mem0_api_key)
-                logger.info("✅ Mem0 client initialized (placeholder)")
-            else:
-                logger.warning("⚠️ Mem0 API key not provided")
-
-            # Initialize Voyage embeddings (placeholder)
-            if settings.voyage_api_key:
-                # cls.voyage_embeddings = VoyageEmbeddings(api_key=settings.voyage_api_key)
-                logger.info("✅ Voyage AI embeddings initialized (placeholder)")
-            else:
-                logger.warning("⚠️ Voyage AI API key not provided")
+        # Concurrent or repeated calls initialize exactly once
+        async with cls._init_lock:
+            if cls._initialized:
+                return
+            
+            try:
+                # Initialize Mem0 (placeholder)
+                if settings.mem0_api_key:
+                    # cls.mem0_client = Memory(api_key=settings.mem0_api_key)
+                    logger.info("✅ Mem0 client initialized (placeholder)")
+                else:
+                    logger.warning("⚠️ Mem0 API key not provided")
 
-        except Exception as e:
-            logger.error(f"❌ Failed to initialize memory store: {e}")
-            raise
+                # Initialize Voyage embeddings (placeholder)
+                if settings.voyage_api_key:
+                    # cls.voyage_embeddings = VoyageEmbeddings(api_key=settings.voyage_api_key)
+                    logger.info("✅ Voyage AI embeddings initialized (placeholder)")
+                else:
+                    logger.warning("⚠️ Voyage AI API key not provided")
+
+                cls._ner_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="ner")
+
+                # spaCy NER is optional; without it extraction falls back to regex patterns.
+                # Loading the model takes seconds, so it happens off the event loop
+                try:
+                    import spacy
+                    cls.nlp = await asyncio.to_thread(
+                        spacy.load, settings.spacy_model, disable=["parser", "tagger", "lemmatizer"]
+                    )
+                    logger.info(f"✅ spaCy NER pipeline loaded ({settings.spacy_model})")
+                except (ImportError, OSError):
+                    logger.warning("⚠️ spaCy model not available, using regex entity extraction")
+
+                cls._initialized = True
+
+            except Exception as e:
+                logger.error(f"❌ Failed to initialize memory store: {e}")
+                raise
 
     @classmethod
     async def add_memory(cls, user_id: str, content: str, metadata: Dict[str, Any] = None) -> Dict[str, Any]:
@@ -62,6 +115,7 @@ class MemoryStore:
             memory_doc = {
                 "user_id": user_id,
                 "content": content,
+                "content_preview": build_content_preview(content),
                 "entities": entities,
                 "metadata": metadata or {},
                 "mem0_id": mem0_result.get("id") if mem0_result else None,
@@ -82,6 +136,7 @@ class MemoryStore:
 
             # Update entity knowledge graphs
             await cls.update_entity_knowledge(user_id, entities, content)
+            invalidate_search_results(user_id)
 
             return {
                 "id": str(result.inserted_id),
@@ -97,19 +152,40 @@ class MemoryStore:
     @classmethod
     async def extract_entities(cls, content: str) -> List[Dict[str, Any]]:
         """Extract entities (people, places, organizations, etc.) from content"""
+        # Extraction is CPU-bound, so keep it off the event loop
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(cls._ner_pool, cls._extract_entities_sync, content)
+
+    @classmethod
+    def shutdown(cls):
+        """Stop the entity extraction workers"""
+        if cls._ner_pool:
+            cls._ner_pool.shutdown(wait=False, cancel_futures=True)
+            cls._ner_pool = None
+        cls._initialized = False
+
+    @classmethod
+    def _extract_entities_sync(cls, content: str) -> List[Dict[str, Any]]:
         try:
-            # This would typically use NER (Named Entity Recognition)
-            # For now, we'll implement a simple keyword-based approach
-            # In production, you'd use spaCy, NLTK, or a service like Abacus.ai
+            content = content[:NER_MAX_CHARS]
             
-            entities = []
+            if cls.nlp:
+                # Only the labels we store as entities; dates, numbers, money etc. are dropped
+                return [
+                    {
+                        "name": ent.text,
+                        "type": _SPACY_ENTITY_TYPES[ent.label_],
+                        "confidence": 0.9
+                    }
+                    for ent in cls.nlp(content).ents
+                    if ent.label_ in _SPACY_ENTITY_TYPES
+                ]
             
-            # Simple patterns for common entities
-            import re
+            # Simple keyword-based fallback when no NER pipeline is loaded
+            entities = []
             
             # People names (capitalized words, common patterns)
-            name_patterns = re.findall(r'\b[A-Z][a-z]+(?:\s+[A-Z][a-z]+)*\b', content)
-            for name in name_patterns:
+            for name in _NAME_RE.findall(content):
                 if len(name.split()) <= 3:  # Reasonable name length
                     entities.append({
                         "name": name,
@@ -118,8 +194,7 @@ class MemoryStore:
                     })
 
             # Organizations (patterns like "Company Inc.", "LLC", etc.)
-            org_patterns = re.findall(r'\b[A-Z][a-zA-Z\s]*(?:Inc|LLC|Corp|Company|Organization)\b', content)
-            for org in org_patterns:
+            for org in _ORG_RE.findall(content):
                 entities.append({
                     "name": org,
                     "type": "organization", 
@@ -128,18 +203,12 @@ class MemoryStore:
 
             # Locations (cities, states, countries - would need a more sophisticated approach)
             # This is a simplified version
-            location_keywords = ['City', 'State', 'Country', 'Street', 'Avenue', 'Road']
-            for keyword in location_keywords:
-                if keyword.lower() in content.lower():
-                    # Extract surrounding context
-                    pattern = rf'\b\w+\s+{keyword}\b'
-                    matches = re.findall(pattern, content, re.IGNORECASE)
-                    for match in matches:
-                        entities.append({
-                            "name": match,
-                            "type": "location",
-                            "confidence": 0.6
-                        })
+            for match in _LOC_RE.findall(content):
+                entities.append({
+                    "name": match,
+                    "type": "location",
+                    "confidence": 0.6
+                })
 
             return entities
 
@@ -151,67 +220,78 @@ class MemoryStore:
     async def update_entity_knowledge(cls, user_id: str, entities: List[Dict], content: str):
         """Update knowledge graphs for extracted entities"""
         try:
+            if not entities:
+                return
+            
             collection = MongoDB.get_collection("entity_knowledge")
+            history = MongoDB.get_collection("entity_mentions")
+            now = datetime.utcnow()
+            mention = {"content": content, "timestamp": now}
             
-            for entity in entities:
-                entity_name = entity["name"]
-                entity_type = entity["type"]
-                
-                # Check if entity already exists
-                existing = await collection.find_one({
-                    "user_id": user_id,
-                    "entity_name": entity_name,
-                    "entity_type": entity_type
-                })
-
-                if existing:
-                    # Update existing entity knowledge
-                    await collection.update_one(
-                        {"_id": existing["_id"]},
-                        {
-                            "$push": {"mentions": {
-                                "content": content,
-                                "timestamp": datetime.utcnow()
-                            }},
-                            "$set": {"updated_at": datetime.utcnow()},
-                            "$inc": {"mention_count": 1}
-                        }
-                    )
-                else:
-                    # Create new entity knowledge
-                    entity_doc = {
-                        "user_id": user_id,
-                        "entity_name": entity_name,
-                        "entity_type": entity_type,
-                        "mentions": [{
-                            "content": content,
-                            "timestamp": datetime.utcnow()
-                        }],
-                        "mention_count": 1,
-                        "created_at": datetime.utcnow(),
-                        "updated_at": datetime.utcnow()
-                    }
-                    await collection.insert_one(entity_doc)
+            # Repeated entities become one upsert each, so the unordered batch
+            # never races itself on the unique (user_id, entity_name, entity_type) key
+            counts = Counter((entity["name"], entity["type"]) for entity in entities)
+            
+            operations = [
+                UpdateOne(
+                    {"user_id": user_id, "entity_name": entity_name, "entity_type": entity_type},
+                    {
+                        "$push": {"mentions": {"$each": [mention] * count, "$slice": -ENTITY_MENTIONS_KEPT}},
+                        "$set": {"updated_at": now},
+                        "$inc": {"mention_count": count},
+                        "$setOnInsert": {"entity_name_norm": entity_name.lower().strip(), "created_at": now}
+                    },
+                    upsert=True
+                )
+                for (entity_name, entity_type), count in counts.items()
+            ]
+            mention_docs = [
+                {"user_id": user_id, "entity_name": entity["name"], "entity_type": entity["type"], **mention}
+                for entity in entities
+            ]
+            await asyncio.gather(
+                collection.bulk_write(operations, ordered=False),
+                history.insert_many(mention_docs, ordered=False)
+            )
 
         except Exception as e:
             logger.error(f"❌ Failed to update entity knowledge: {e}")
 
     @classmethod
-    async def get_entity_knowledge(cls, user_id: str, entity_name: str) -> Dict[str, Any]:
-        """Get all knowledge about a specific entity"""
+    async def get_entity_knowledge(cls, user_id: str, entity_name: str, skip: int = 0, limit: int = 50) -> Dict[str, Any]:
+        """Get all knowledge about a specific entity, with a page of its mentions"""
         try:
             collection = MongoDB.get_collection("entity_knowledge")
             
-            entity_data = await collection.find_one({
-                "user_id": user_id,
-                "entity_name": {"$regex": entity_name, "$options": "i"}
-            })
+            # Exact match on the normalized name is a single index probe
+            entity_data = await collection.find_one(
+                {
+                    "user_id": user_id,
+                    "entity_name_norm": entity_name.lower().strip()
+                },
+                {"mentions": {"$slice": -limit}},
+                sort=[("mention_count", -1)]
+            )
 
             if not entity_data:
                 return {"entity_name": entity_name, "mentions": [], "summary": "No information found"}
 
+            # Newest mentions first from the history collection
+            history = MongoDB.get_collection("entity_mentions")
+            mentions = await history.find(
+                {
+                    "user_id": user_id,
+                    "entity_name": entity_data["entity_name"],
+                    "entity_type": entity_data["entity_type"]
+                },
+                {"_id": 0, "content": 1, "timestamp": 1}
+            ).sort("timestamp", -1).skip(skip).limit(limit).to_list(length=limit)
+            
+            # Entities recorded before the history collection only have inline mentions
+            if not mentions and not skip:
+                mentions = entity_data.get("mentions", [])[::-1]
+
             # Generate a summary of the entity
-            mentions = entity_data.get("mentions", [])
             summary = await cls.generate_entity_summary(entity_name, mentions)
 
             return {
@@ -246,8 +326,8 @@ class MemoryStore:
             return f"Error generating summary for {entity_name}"
 
     @classmethod
-    async def search_memories(cls, user_id: str, query: str, limit: int = 10) -> List[Dict[str, Any]]:
-        """Search memories using semantic similarity"""
+    async def search_memories(cls, user_id: str, query: str, limit: int = 10, preview: bool = False) -> List[Dict[str, Any]]:
+        """Search memories using semantic similarity; preview returns content_preview as content"""
         try:
             collection = MongoDB.get_collection("memories")
             
@@ -260,15 +340,19 @@ class MemoryStore:
                 pass
                 
             # Text search fallback
+            content_field = "content_preview" if preview else "content"
             results = await collection.find({
                 "user_id": user_id,
                 "$text": {"$search": query}
-            }).limit(limit).to_list(length=limit)
+            }, {
+                "score": {"$meta": "textScore"},
+                content_field: 1, "entities": 1, "metadata": 1, "created_at": 1
+            }).sort([("score", {"$meta": "textScore"})]).limit(limit).batch_size(limit).to_list(length=limit)
 
             return [
                 {
                     "id": str(doc["_id"]),
-                    "content": doc["content"],
+                    "content": doc.get(content_field, ""),
                     "entities": doc.get("entities", []),
                     "metadata": doc.get("metadata", {}),
                     "created_at": doc["created_at"]
@@ -0,0 +1,35 @@
+from datetime import datetime
+from typing import Any, Dict, Optional, Tuple
+from bson import ObjectId
+from bson.errors import InvalidId
+
+# Keyset cursors pair the sort key with _id, so rows sharing a timestamp are
+# neither skipped nor repeated across pages
+
+def encode_cursor(value: Optional[datetime], oid: ObjectId) -> str:
+    """Opaque cursor for the row a page ended on"""
+    return f"{value.isoformat() if value else ''}_{oid}"
+
+def decode_cursor(cursor: str) -> Tuple[Optional[datetime], ObjectId]:
+    """Split a cursor made by encode_cursor; raises ValueError if it is malformed"""
+    value, sep, oid = cursor.rpartition("_")
+    if not sep:
+        raise ValueError("Malformed cursor")
+    try:
+        return (datetime.fromisoformat(value) if value else None), ObjectId(oid)
+    except InvalidId as e:
+        raise ValueError("Malformed cursor") from e
+
+def keyset_filter(field: str, value: Optional[datetime], oid: ObjectId, direction: int) -> Dict[str, Any]:
+    """Match rows strictly after (value, oid) in a [(field, direction), ("_id", direction)] sort"""
+    op = "$gt" if direction == 1 else "$lt"
+    if value is None:
+        # Nulls sort before every date, so ascending pages continue into the dated rows
+        clauses = [{field: None, "_id": {op: oid}}]
+        if direction == 1:
+            clauses.append({field: {"$ne": None}})
+    else:
+        clauses = [{field: {op: value}}, {field: value, "_id": {op: oid}}]
+        if direction == -1:
+            clauses.append({field: None})
+    return {"$or": clauses}
@@ -0,0 +1,10 @@
+from typing import Any
+
+import orjson
+from fastapi.responses import ORJSONResponse
+
+class AppJSONResponse(ORJSONResponse):
+    """orjson response that also encodes ObjectId and other leftovers as strings"""
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, default=str, option=orjson.OPT_NON_STR_KEYS)
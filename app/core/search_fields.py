@@ -0,0 +1,18 @@
+from typing import Any, Dict, List
+
+def generate_ngrams(text: str, min_words: int, max_words: int) -> List[str]:
+    """Return every run of min_words to max_words consecutive words in text"""
+    words = text.split()
+    return [
+        " ".join(words[start:start + size])
+        for size in range(min_words, max_words + 1)
+        for start in range(len(words) - size + 1)
+    ]
+
+def title_search_fields(title: str) -> Dict[str, Any]:
+    """Denormalized title fields that back the suggestions indexes"""
+    title_lower = title.lower()
+    return {
+        "title_lower": title_lower,
+        "title_phrases": generate_ngrams(title_lower, 2, 6) + [title_lower]
+    }
@@ -0,0 +1,13 @@
+from typing import Dict
+
+# Per-user write counters; search caches key on them, so bumping a user's
+# version makes all of that user's cached results unreachable
+_search_versions: Dict[str, int] = {}
+
+def search_version(user_id: str) -> int:
+    """Current write version for a user's searchable content"""
+    return _search_versions.get(user_id, 0)
+
+def invalidate_search_results(user_id: str):
+    """Invalidate cached search results and suggestions for a user"""
+    _search_versions[user_id] = _search_versions.get(user_id, 0) + 1
@@ -1,7 +1,7 @@
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 from typing import Optional, List, Dict, Any
 from datetime import datetime
-from bson import ObjectId
+from app.core.clock import utcnow
 from .user import PyObjectId
 from enum import Enum
 
@@ -49,14 +49,14 @@ class CalendarEventInDB(CalendarEventBase):
     apple_event_id: Optional[str] = None  # ID from Apple Calendar
     recurrence_type: RecurrenceType = RecurrenceType.NONE
     recurrence_end: Optional[datetime] = None
-    created_at: datetime = Field(default_factory=datetime.utcnow)
-    updated_at: datetime = Field(default_factory=datetime.utcnow)
+    created_at: datetime = Field(default_factory=utcnow)
+    updated_at: datetime = Field(default_factory=utcnow)
     synced_at: Optional[datetime] = None
     
-    class Config:
-        allow_population_by_field_name = True
-        arbitrary_types_allowed = True
-        json_encoders = {ObjectId: str}
+    model_config = ConfigDict(
+        populate_by_name=True,
+        arbitrary_types_allowed=True
+    )
 
 class CalendarEvent(CalendarEventBase):
     id: str
@@ -69,6 +69,8 @@ class CalendarEvent(CalendarEventBase):
     created_at: datetime
     updated_at: datetime
     synced_at: Optional[datetime]
+    
+    model_config = ConfigDict(frozen=True, from_attributes=True)
 
 class CalendarSyncStatus(BaseModel):
     user_id: str
@@ -1,9 +1,16 @@
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field, field_validator
 from typing import Optional, List, Dict, Any
 from datetime import datetime
-from bson import ObjectId
+from app.core.clock import utcnow
 from .user import PyObjectId
 from enum import Enum
+import re
+
+_WORD_RE = re.compile(r'\S+')
+
+def word_count(text: str) -> int:
+    """Count whitespace-separated words without building the list that split() would"""
+    return sum(1 for _ in _WORD_RE.finditer(text)) if text else 0
 
 class DocumentType(str, Enum):
     TEXT = "text"
@@ -16,6 +23,14 @@ class DocumentType(str, Enum):
     VIDEO = "video"
     OTHER = "other"
 
+_DOCTYPE_BY_VALUE = {m.value: m for m in DocumentType}
+
+def _coerce_document_type(v):
+    """Map raw values straight to members; unknown ones fall through to normal validation"""
+    if isinstance(v, DocumentType) or not isinstance(v, str):
+        return v
+    return _DOCTYPE_BY_VALUE.get(v, v)
+
 class DocumentBase(BaseModel):
     title: str = Field(..., min_length=1, max_length=200)
     content: Optional[str] = None  # Extracted text content
@@ -25,6 +40,8 @@ class DocumentBase(BaseModel):
     document_type: DocumentType = DocumentType.TEXT
     tags: List[str] = Field(default_factory=list)
     
+    coerce_document_type = field_validator("document_type", mode="before")(_coerce_document_type)
+    
 class DocumentCreate(DocumentBase):
     project_id: Optional[str] = None
 
@@ -35,20 +52,22 @@ class DocumentUpdate(BaseModel):
     project_id: Optional[str] = None
 
 class DocumentInDB(DocumentBase):
-    id: PyObjectId = Field(default_factory=PyObjectId, alias="_id")
+    # Excluded from model_dump so the insert payload never carries an _id
+    id: PyObjectId = Field(default_factory=PyObjectId, alias="_id", exclude=True)
     user_id: str
     project_id: Optional[str] = None
     word_count: int = 0
     processed: bool = False  # Whether content has been processed for memories
     embedding: Optional[List[float]] = None  # Vector embedding
+    content_hash: Optional[str] = None  # xxh3-128 of the uploaded file
     entities: List[Dict[str, Any]] = Field(default_factory=list)
-    created_at: datetime = Field(default_factory=datetime.utcnow)
-    updated_at: datetime = Field(default_factory=datetime.utcnow)
+    created_at: datetime = Field(default_factory=utcnow)
+    updated_at: datetime = Field(default_factory=utcnow)
     
-    class Config:
-        allow_population_by_field_name = True
-        arbitrary_types_allowed = True
-        json_encoders = {ObjectId: str}
+    model_config = ConfigDict(
+        populate_by_name=True,
+        arbitrary_types_allowed=True
+    )
 
 class Document(DocumentBase):
     id: str
@@ -59,6 +78,15 @@ class Document(DocumentBase):
     entities: List[Dict[str, Any]]
     created_at: datetime
     updated_at: datetime
+    
+    model_config = ConfigDict(frozen=True, from_attributes=True)
+    
+    def fast_dump(self) -> Dict[str, Any]:
+        """Field values straight from __dict__, skipping model_dump; for rows built with model_construct"""
+        values = self.__dict__
+        return {k: values[k] for k in _DOCUMENT_FIELDS}
+
+_DOCUMENT_FIELDS = tuple(Document.model_fields)
 
 class DocumentProcessingStatus(BaseModel):
     document_id: str
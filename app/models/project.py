@@ -1,7 +1,7 @@
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 from typing import Optional, List, Dict, Any
 from datetime import datetime
-from bson import ObjectId
+from app.core.clock import utcnow
 from .user import PyObjectId
 
 class ProjectBase(BaseModel):
@@ -27,14 +27,14 @@ class ProjectInDB(ProjectBase):
     user_id: str
     is_archived: bool = False
     document_count: int = 0
-    last_activity: datetime = Field(default_factory=datetime.utcnow)
-    created_at: datetime = Field(default_factory=datetime.utcnow)
-    updated_at: datetime = Field(default_factory=datetime.utcnow)
+    last_activity: datetime = Field(default_factory=utcnow)
+    created_at: datetime = Field(default_factory=utcnow)
+    updated_at: datetime = Field(default_factory=utcnow)
     
-    class Config:
-        allow_population_by_field_name = True
-        arbitrary_types_allowed = True
-        json_encoders = {ObjectId: str}
+    model_config = ConfigDict(
+        populate_by_name=True,
+        arbitrary_types_allowed=True
+    )
 
 class Project(ProjectBase):
     id: str
@@ -44,6 +44,19 @@ class Project(ProjectBase):
     last_activity: datetime
     created_at: datetime
     updated_at: datetime
+    
+    model_config = ConfigDict(frozen=True, from_attributes=True)
+    
+    def fast_dump(self) -> Dict[str, Any]:
+        """Field values straight from __dict__, skipping model_dump; for rows built with model_construct"""
+        values = self.__dict__
+        return {k: values[k] for k in _PROJECT_FIELDS}
+
+_PROJECT_FIELDS = tuple(Project.model_fields)
+
+class ProjectPage(BaseModel):
+    items: List[Project]
+    next_before: Optional[str] = None  # Pass back as `before` to get the next page
 
 class ProjectStats(BaseModel):
     project_id: str
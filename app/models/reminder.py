@@ -1,7 +1,7 @@
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field, field_validator
 from typing import Optional, List, Dict, Any
 from datetime import datetime
-from bson import ObjectId
+from app.core.clock import utcnow
 from .user import PyObjectId
 from enum import Enum
 
@@ -16,6 +16,21 @@ class ReminderStatus(str, Enum):
     COMPLETED = "completed"
     CANCELLED = "cancelled"
 
+_PRIORITY_BY_VALUE = {m.value: m for m in ReminderPriority}
+_STATUS_BY_VALUE = {m.value: m for m in ReminderStatus}
+
+def _coerce_priority(v):
+    """Map raw values straight to members; unknown ones fall through to normal validation"""
+    if isinstance(v, ReminderPriority) or not isinstance(v, str):
+        return v
+    return _PRIORITY_BY_VALUE.get(v, v)
+
+def _coerce_status(v):
+    """Map raw values straight to members; unknown ones fall through to normal validation"""
+    if isinstance(v, ReminderStatus) or not isinstance(v, str):
+        return v
+    return _STATUS_BY_VALUE.get(v, v)
+
 class ReminderBase(BaseModel):
     title: str = Field(..., min_length=1, max_length=200)
     description: Optional[str] = None
@@ -23,6 +38,10 @@ class ReminderBase(BaseModel):
     priority: ReminderPriority = ReminderPriority.MEDIUM
     tags: List[str] = Field(default_factory=list)
     
+    coerce_priority = field_validator("priority", mode="before")(_coerce_priority)
+    # status only exists on the stored and read models
+    coerce_status = field_validator("status", mode="before", check_fields=False)(_coerce_status)
+    
 class ReminderCreate(ReminderBase):
     project_id: Optional[str] = None
     related_document_id: Optional[str] = None
@@ -35,6 +54,9 @@ class ReminderUpdate(BaseModel):
     tags: Optional[List[str]] = None
     status: Optional[ReminderStatus] = None
     completed_at: Optional[datetime] = None
+    
+    coerce_priority = field_validator("priority", mode="before")(_coerce_priority)
+    coerce_status = field_validator("status", mode="before")(_coerce_status)
 
 class ReminderInDB(ReminderBase):
     id: PyObjectId = Field(default_factory=PyObjectId, alias="_id")
@@ -44,14 +66,14 @@ class ReminderInDB(ReminderBase):
     status: ReminderStatus = ReminderStatus.PENDING
     apple_reminder_id: Optional[str] = None  # ID from Apple Reminders
     completed_at: Optional[datetime] = None
-    created_at: datetime = Field(default_factory=datetime.utcnow)
-    updated_at: datetime = Field(default_factory=datetime.utcnow)
+    created_at: datetime = Field(default_factory=utcnow)
+    updated_at: datetime = Field(default_factory=utcnow)
     synced_at: Optional[datetime] = None
     
-    class Config:
-        allow_population_by_field_name = True
-        arbitrary_types_allowed = True
-        json_encoders = {ObjectId: str}
+    model_config = ConfigDict(
+        populate_by_name=True,
+        arbitrary_types_allowed=True
+    )
 
 class Reminder(ReminderBase):
     id: str
@@ -64,6 +86,19 @@ class Reminder(ReminderBase):
     created_at: datetime
     updated_at: datetime
     synced_at: Optional[datetime]
+    
+    model_config = ConfigDict(frozen=True, from_attributes=True)
+    
+    def fast_dump(self) -> Dict[str, Any]:
+        """Field values straight from __dict__, skipping model_dump; for rows built with model_construct"""
+        values = self.__dict__
+        return {k: values[k] for k in _REMINDER_FIELDS}
+
+_REMINDER_FIELDS = tuple(Reminder.model_fields)
+
+class ReminderPage(BaseModel):
+    items: List[Reminder]
+    next_after: Optional[str] = None  # Pass back as `after` to get the next page
 
 class ReminderSyncStatus(BaseModel):
     user_id: str
@@ -1,7 +1,9 @@
-from pydantic import BaseModel, EmailStr, Field
+from pydantic import BaseModel, ConfigDict, EmailStr, Field
 from typing import Optional, List
 from datetime import datetime
+from app.core.clock import utcnow
 from bson import ObjectId
+from bson.errors import InvalidId
 
 class PyObjectId(ObjectId):
     @classmethod
@@ -10,9 +12,13 @@ class PyObjectId(ObjectId):
 
     @classmethod
     def validate(cls, v):
-        if not ObjectId.is_valid(v):
+        if isinstance(v, ObjectId):
+            return v
+        # A single parse; ObjectId() already rejects anything is_valid would
+        try:
+            return ObjectId(v)
+        except (InvalidId, TypeError):
             raise ValueError("Invalid objectid")
-        return ObjectId(v)
 
     @classmethod
     def __modify_schema__(cls, field_schema):
@@ -35,13 +41,13 @@ class UserInDB(UserBase):
     id: PyObjectId = Field(default_factory=PyObjectId, alias="_id")
     hashed_password: str
     is_active: bool = True
-    created_at: datetime = Field(default_factory=datetime.utcnow)
-    updated_at: datetime = Field(default_factory=datetime.utcnow)
+    created_at: datetime = Field(default_factory=utcnow)
+    updated_at: datetime = Field(default_factory=utcnow)
     
-    class Config:
-        allow_population_by_field_name = True
-        arbitrary_types_allowed = True
-        json_encoders = {ObjectId: str}
+    model_config = ConfigDict(
+        populate_by_name=True,
+        arbitrary_types_allowed=True
+    )
 
 class User(UserBase):
     id: str
@@ -49,6 +55,8 @@ class User(UserBase):
     created_at: datetime
     updated_at: datetime
     
+    model_config = ConfigDict(frozen=True, from_attributes=True)
+    
 class UserSettings(BaseModel):
     user_id: str
     apple_calendar_enabled: bool = True
@@ -0,0 +1,113 @@
+import asyncio
+import logging
+import re
+from typing import List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# osascript reports failures as "...: execution error: <message> (<code>)"
+_APPLESCRIPT_ERROR = re.compile(r"(?:execution|syntax) error: .*\(-?\d+\)$")
+
+class OsascriptSession:
+    """A long-lived interactive osascript process shared by successive scripts"""
+    
+    _SENTINEL = "__END__"
+    _SENTINEL_RE = re.compile(_SENTINEL + r"\d+")
+    
+    def __init__(self, timeout: float = 30.0):
+        self.timeout = timeout
+        self._proc: Optional[asyncio.subprocess.Process] = None
+        self._lock = asyncio.Lock()
+    
+    async def run(self, script: str) -> Optional[str]:
+        """Run a script of one-line statements and return their output, or None on error"""
+        results = await self._exchange([script])
+        if not results or not results[0][0]:
+            return None
+        return "\n".join(results[0][1])
+    
+    async def run_each(self, statements: List[str]) -> List[bool]:
+        """Run one-line statements independently and report which of them succeeded"""
+        results = await self._exchange(statements)
+        # Statements after a lost session are unconfirmed and count as failed
+        return [ok for ok, _ in results] + [False] * (len(statements) - len(results))
+    
+    async def _exchange(self, chunks: List[str]) -> List[Tuple[bool, List[str]]]:
+        """Send each chunk followed by a numbered sentinel; return (succeeded, output) per confirmed chunk"""
+        async with self._lock:
+            results: List[Tuple[bool, List[str]]] = []
+            try:
+                if self._proc is None or self._proc.returncode is not None:
+                    # Errors are merged into stdout so an unread stderr pipe can never fill up
+                    self._proc = await asyncio.create_subprocess_exec(
+                        'osascript', '-i',
+                        stdin=asyncio.subprocess.PIPE,
+                        stdout=asyncio.subprocess.PIPE,
+                        stderr=asyncio.subprocess.STDOUT
+                    )
+                
+                # Interactive mode evaluates line by line and keeps going after an error,
+                # so each chunk's sentinel closes off the output and errors that belong to it
+                self._proc.stdin.write("".join(
+                    f'{chunk}\n"{self._SENTINEL}{index}"\n' for index, chunk in enumerate(chunks)
+                ).encode())
+                await self._proc.stdin.drain()
+                
+                output = []
+                failed = False
+                while len(results) < len(chunks):
+                    line = await asyncio.wait_for(self._proc.stdout.readline(), self.timeout)
+                    if not line:
+                        # osascript exited; the next call starts a fresh one
+                        logger.error("AppleScript session ended unexpectedly")
+                        self._proc = None
+                        return results
+                    
+                    text = line.decode().strip().lstrip("?").strip()
+                    if text.startswith("=>"):
+                        text = text[2:].strip()
+                    if self._SENTINEL_RE.search(text):
+                        results.append((not failed, output))
+                        output = []
+                        failed = False
+                    elif _APPLESCRIPT_ERROR.search(text):
+                        logger.error(f"AppleScript error: {text}")
+                        failed = True
+                    elif text:
+                        output.append(text)
+                
+                return results
+                
+            except Exception as e:
+                logger.error(f"Failed to run AppleScript: {e}")
+                await self._kill()
+                return results
+    
+    async def close(self):
+        """Stop the osascript process"""
+        async with self._lock:
+            await self._kill()
+    
+    async def _kill(self):
+        if self._proc is not None and self._proc.returncode is None:
+            self._proc.kill()
+            await self._proc.wait()
+        self._proc = None
+
+class AppleScriptRunner:
+    """Base for services that drive an Apple app through their own osascript session"""
+    
+    def __init__(self):
+        self._session = OsascriptSession()
+    
+    async def _run_applescript(self, script: str) -> Optional[str]:
+        """Execute AppleScript statements on the service's osascript session"""
+        return await self._session.run(script)
+    
+    async def _run_applescript_each(self, statements: List[str]) -> List[bool]:
+        """Execute independent AppleScript statements, reporting success for each"""
+        return await self._session.run_each(statements)
+    
+    async def close(self):
+        """Stop the service's osascript session"""
+        await self._session.close()
@@ -1,18 +1,37 @@
 import logging
-import subprocess
-import asyncio
 from typing import Optional, Dict, Any, List
 from datetime import datetime
-import json
 
 from app.core.config import settings
+from app.services._applescript import AppleScriptRunner
 
 logger = logging.getLogger(__name__)
 
-class AppleCalendarService:
+# Escapes for text interpolated into AppleScript string literals; newlines must go
+# too, since the interactive session reads one statement per line
+_ASCRIPT_ESCAPE = str.maketrans({'"': '\\"', '\\': '\\\\', '\n': '\\n', '\r': '\\r'})
+
+# Our priority levels mapped to Apple's numeric priorities
+_PRIORITY_MAP = {
+    "low": 1,
+    "medium": 5,
+    "high": 9,
+    "urgent": 9
+}
+
+def _esc(value: Optional[str]) -> str:
+    """Make a value safe to embed in an AppleScript string literal"""
+    return value.translate(_ASCRIPT_ESCAPE) if value else ""
+
+def _fmt_applescript_date(dt: datetime) -> str:
+    """Format a datetime as MM/DD/YYYY HH:MM:SS without going through strftime"""
+    return f"{dt.month:02d}/{dt.day:02d}/{dt.year} {dt.hour:02d}:{dt.minute:02d}:{dt.second:02d}"
+
+class AppleCalendarService(AppleScriptRunner):
     """Service for integrating with Apple Calendar using AppleScript"""
     
     def __init__(self):
+        super().__init__()
         self.enabled = settings.apple_script_enabled
     
     async def create_event(self, event_data: Dict[str, Any]) -> Optional[str]:
@@ -22,29 +41,11 @@ class AppleCalendarService:
             return None
         
         try:
-            # Format dates for AppleScript
-            start_date = event_data.get("start_date")
-            end_date = event_data.get("end_date")
-            
-            if not start_date or not end_date:
+            script = self._event_statement(event_data)
+            if not script:
                 logger.error("Start date and end date are required")
                 return None
             
-            # Create AppleScript command
-            script = f'''
-            tell application "Calendar"
-                tell calendar "Second Brain"
-                    make new event with properties {{
-                        summary: "{event_data.get('title', '')}",
-                        description: "{event_data.get('description', '')}",
-                        start date: date "{start_date.strftime('%m/%d/%Y %H:%M:%S')}",
-                        end date: date "{end_date.strftime('%m/%d/%Y %H:%M:%S')}",
-                        location: "{event_data.get('location', '')}"
-                    }}
-                end tell
-            end tell
-            '''
-            
             # Execute AppleScript
             result = await self._run_applescript(script)
             
@@ -58,6 +59,47 @@ class AppleCalendarService:
             logger.error(f"Failed to create Apple Calendar event: {e}")
             return None
     
+    async def create_events_bulk(self, events_data: List[Dict[str, Any]]) -> List[bool]:
+        """Create several events in Apple Calendar in one round trip; returns which were created"""
+        if not self.enabled:
+            logger.info("Apple Calendar integration disabled")
+            return [False] * len(events_data)
+        
+        try:
+            statements = list(map(self._event_statement, events_data))
+            sendable = [statement for statement in statements if statement]
+            if not sendable:
+                return [False] * len(events_data)
+            
+            # Each statement succeeds or fails on its own; only the confirmed ones count as created
+            outcomes = iter(await self._run_applescript_each(sendable))
+            created = [bool(statement) and next(outcomes) for statement in statements]
+            
+            logger.info(f"Created {sum(created)} of {len(events_data)} Apple Calendar events")
+            return created
+            
+        except Exception as e:
+            logger.error(f"Failed to create Apple Calendar events: {e}")
+            return [False] * len(events_data)
+    
+    def _event_statement(self, event_data: Dict[str, Any]) -> Optional[str]:
+        """One-line AppleScript statement that creates the event, or None without dates"""
+        start_date = event_data.get("start_date")
+        end_date = event_data.get("end_date")
+        if not start_date or not end_date:
+            return None
+        
+        title = _esc(event_data.get("title"))
+        description = _esc(event_data.get("description"))
+        location = _esc(event_data.get("location"))
+        start = _fmt_applescript_date(start_date)
+        end = _fmt_applescript_date(end_date)
+        return (
+            'tell application "Calendar" to tell calendar "Second Brain" to make new event with properties '
+            f'{{summary:"{title}", description:"{description}", '
+            f'start date:date "{start}", end date:date "{end}", location:"{location}"}}'
+        )
+    
     async def update_event(self, apple_event_id: str, update_data: Dict[str, Any]) -> bool:
         """Update an event in Apple Calendar"""
         if not self.enabled:
@@ -86,8 +128,8 @@ class AppleCalendarService:
             logger.error(f"Failed to delete Apple Calendar event: {e}")
             return False
     
-    async def sync_calendar(self, user_id: str) -> Dict[str, Any]:
-        """Sync calendar events with Apple Calendar"""
+    async def sync_calendar(self, user_id: str, pending: Optional[List[Dict[str, Any]]] = None) -> Dict[str, Any]:
+        """Sync calendar events with Apple Calendar, pushing pending ones in one round trip"""
         if not self.enabled:
             return {"status": "disabled", "message": "Apple Calendar integration disabled"}
         
@@ -95,42 +137,32 @@ class AppleCalendarService:
             # This would implement full bidirectional sync
             logger.info(f"Syncing calendar for user: {user_id}")
             
+            created = await self.create_events_bulk(pending) if pending else []
+            synced_ids = [event["_id"] for event, ok in zip(pending or [], created) if ok]
+            
             return {
                 "status": "success",
-                "events_synced": 0,
+                "events_synced": len(synced_ids),
+                "synced_ids": synced_ids,
                 "last_sync": datetime.utcnow().isoformat()
             }
             
         except Exception as e:
             logger.error(f"Calendar sync failed: {e}")
             return {"status": "error", "message": str(e)}
-    
-    async def _run_applescript(self, script: str) -> Optional[str]:
-        """Execute an AppleScript command"""
-        try:
-            # Use osascript to run AppleScript
-            process = await asyncio.create_subprocess_exec(
-                'osascript', '-e', script,
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE
-            )
-            
-            stdout, stderr = await process.communicate()
-            
-            if process.returncode == 0:
-                return stdout.decode().strip()
-            else:
-                logger.error(f"AppleScript error: {stderr.decode()}")
-                return None
-                
-        except Exception as e:
-            logger.error(f"Failed to run AppleScript: {e}")
-            return None
 
-class AppleRemindersService:
+# Shared instance; the service holds no per-request state
+_calendar_service = AppleCalendarService()
+
+def get_apple_calendar_service() -> AppleCalendarService:
+    """Get the shared Apple Calendar service"""
+    return _calendar_service
+
+class AppleRemindersService(AppleScriptRunner):
     """Service for integrating with Apple Reminders using AppleScript"""
     
     def __init__(self):
+        super().__init__()
         self.enabled = settings.apple_script_enabled
     
     async def create_reminder(self, reminder_data: Dict[str, Any]) -> Optional[str]:
@@ -140,27 +172,8 @@ class AppleRemindersService:
             return None
         
         try:
-            due_date = reminder_data.get("due_date")
-            due_date_str = ""
-            if due_date:
-                due_date_str = f'due date: date "{due_date.strftime('%m/%d/%Y %H:%M:%S')}",'
-            
-            # Create AppleScript command
-            script = f'''
-            tell application "Reminders"
-                tell list "Second Brain"
-                    make new reminder with properties {{
-                        name: "{reminder_data.get('title', '')}",
-                        body: "{reminder_data.get('description', '')}",
-                        {due_date_str}
-                        priority: {self._convert_priority(reminder_data.get('priority', 'medium'))}
-                    }}
-                end tell
-            end tell
-            '''
-            
             # Execute AppleScript
-            result = await self._run_applescript(script)
+            result = await self._run_applescript(self._reminder_statement(reminder_data))
             
             if result:
                 logger.info(f"Created Apple Reminder: {reminder_data.get('title')}")
@@ -172,6 +185,22 @@ class AppleRemindersService:
             logger.error(f"Failed to create Apple Reminder: {e}")
             return None
     
+    def _reminder_statement(self, reminder_data: Dict[str, Any]) -> str:
+        """One-line AppleScript statement that creates the reminder"""
+        title = _esc(reminder_data.get("title"))
+        description = _esc(reminder_data.get("description"))
+        priority = self._convert_priority(reminder_data.get("priority", "medium"))
+        
+        due_date = reminder_data.get("due_date")
+        due_date_str = ""
+        if due_date:
+            due_date_str = f'due date:date "{_fmt_applescript_date(due_date)}", '
+        
+        return (
+            'tell application "Reminders" to tell list "Second Brain" to make new reminder with properties '
+            f'{{name:"{title}", body:"{description}", {due_date_str}priority:{priority}}}'
+        )
+    
     async def update_reminder(self, apple_reminder_id: str, update_data: Dict[str, Any]) -> bool:
         """Update a reminder in Apple Reminders"""
         if not self.enabled:
@@ -200,8 +229,8 @@ class AppleRemindersService:
             logger.error(f"Failed to delete Apple Reminder: {e}")
             return False
     
-    async def sync_reminders(self, user_id: str) -> Dict[str, Any]:
-        """Sync reminders with Apple Reminders"""
+    async def sync_reminders(self, user_id: str, pending: Optional[List[Dict[str, Any]]] = None) -> Dict[str, Any]:
+        """Sync reminders with Apple Reminders, pushing pending ones in one round trip"""
         if not self.enabled:
             return {"status": "disabled", "message": "Apple Reminders integration disabled"}
         
@@ -209,9 +238,18 @@ class AppleRemindersService:
             # This would implement full bidirectional sync
             logger.info(f"Syncing reminders for user: {user_id}")
             
+            synced_ids = []
+            if pending:
+                # Each statement succeeds or fails on its own; only the confirmed ones count as synced
+                created = await self._run_applescript_each(list(map(self._reminder_statement, pending)))
+                synced_ids = [reminder["_id"] for reminder, ok in zip(pending, created) if ok]
+                if not synced_ids:
+                    return {"status": "error", "message": "Failed to push reminders to Apple Reminders"}
+            
             return {
                 "status": "success",
-                "reminders_synced": 0,
+                "reminders_synced": len(synced_ids),
+                "synced_ids": synced_ids,
                 "last_sync": datetime.utcnow().isoformat()
             }
             
@@ -221,32 +259,12 @@ class AppleRemindersService:
     
     def _convert_priority(self, priority: str) -> int:
         """Convert our priority system to Apple's numeric system"""
-        priority_map = {
-            "low": 1,
-            "medium": 5,
-            "high": 9,
-            "urgent": 9
-        }
-        return priority_map.get(priority.lower(), 5)
-    
-    async def _run_applescript(self, script: str) -> Optional[str]:
-        """Execute an AppleScript command"""
-        try:
-            # Use osascript to run AppleScript
-            process = await asyncio.create_subprocess_exec(
-                'osascript', '-e', script,
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE
-            )
-            
-            stdout, stderr = await process.communicate()
-            
-            if process.returncode == 0:
-                return stdout.decode().strip()
-            else:
-                logger.error(f"AppleScript error: {stderr.decode()}")
-                return None
-                
-        except Exception as e:
-            logger.error(f"Failed to run AppleScript: {e}")
-            return None
\ No newline at end of file
+        # Enum members hash by name, so look up by their (already lowercase) value
+        priority = getattr(priority, "value", priority)
+        return _PRIORITY_MAP.get(priority if priority.islower() else priority.lower(), 5)
+
+_reminders_service = AppleRemindersService()
+
+def get_apple_reminders_service() -> AppleRemindersService:
+    """Get the shared Apple Reminders service"""
+    return _reminders_service
@@ -1,63 +1,68 @@
 import os
 import logging
-from typing import Optional
-import aiofiles
-import asyncio
-from pathlib import Path
+from typing import ClassVar, Dict, Optional, Tuple
+from app.models.document import word_count
 
 logger = logging.getLogger(__name__)
 
+TEXT_READ_CHUNK_SIZE = 1024 * 1024  # 1MB
+
 class DocumentProcessor:
-    """Service for processing and extracting text from various document types"""
+    """Service for processing and extracting text from various document types
+    
+    Extraction is synchronous and CPU-bound (PyPDF2, python-docx, openpyxl, ...);
+    it runs in the documents route's worker processes, never on the event loop.
+    """
     
-    def __init__(self):
-        self.supported_formats = {
-            '.txt': self._extract_text_file,
-            '.md': self._extract_text_file,
-            '.pdf': self._extract_pdf,
-            '.docx': self._extract_docx,
-            '.doc': self._extract_doc,
-            '.xlsx': self._extract_xlsx,
-            '.xls': self._extract_xls,
-            '.pptx': self._extract_pptx,
-            '.ppt': self._extract_ppt,
-        }
+    # Extension -> extractor method name, resolved with getattr at dispatch
+    _SUPPORTED_FORMATS: ClassVar[Dict[str, str]] = {
+        '.txt': '_extract_text_file',
+        '.md': '_extract_text_file',
+        '.pdf': '_extract_pdf',
+        '.docx': '_extract_docx',
+        '.doc': '_extract_doc',
+        '.xlsx': '_extract_xlsx',
+        '.xls': '_extract_xls',
+        '.pptx': '_extract_pptx',
+        '.ppt': '_extract_ppt',
+    }
     
-    async def extract_text(self, file_path: str) -> Optional[str]:
+    def extract_text(self, file_path: str) -> Optional[str]:
         """Extract text content from a file"""
         try:
-            if not os.path.exists(file_path):
-                logger.error(f"File not found: {file_path}")
-                return None
-            
-            # Get file extension
-            file_ext = Path(file_path).suffix.lower()
+            # Get file extension; splitext avoids building a Path per file
+            file_ext = os.path.splitext(file_path)[1].lower()
             
-            if file_ext not in self.supported_formats:
+            extractor_name = self._SUPPORTED_FORMATS.get(file_ext)
+            if extractor_name is None:
                 logger.warning(f"Unsupported file format: {file_ext}")
                 return None
             
-            # Extract text using appropriate method
-            extractor = self.supported_formats[file_ext]
-            content = await extractor(file_path)
+            if not os.path.exists(file_path):
+                logger.error(f"File not found: {file_path}")
+                return None
             
-            return content
+            # Extract text using appropriate method
+            return getattr(self, extractor_name)(file_path)
             
         except Exception as e:
             logger.error(f"Failed to extract text from {file_path}: {e}")
             return None
     
-    async def _extract_text_file(self, file_path: str) -> Optional[str]:
+    def _extract_text_file(self, file_path: str) -> Optional[str]:
         """Extract text from plain text files"""
         try:
-            async with aiofiles.open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                content = await f.read()
-                return content.strip()
+            # Read raw bytes in bounded chunks and decode once at the end
+            chunks = []
+            with open(file_path, 'rb') as f:
+                while chunk := f.read(TEXT_READ_CHUNK_SIZE):
+                    chunks.append(chunk)
+            return b''.join(chunks).decode('utf-8', 'ignore').strip()
         except Exception as e:
             logger.error(f"Failed to read text file {file_path}: {e}")
             return None
     
-    async def _extract_pdf(self, file_path: str) -> Optional[str]:
+    def _extract_pdf(self, file_path: str) -> Optional[str]:
         """Extract text from PDF files"""
         try:
             # Use PyPDF2 or pdfplumber for PDF extraction
@@ -68,7 +73,7 @@ class DocumentProcessor:
             logger.error(f"Failed to extract PDF {file_path}: {e}")
             return None
     
-    async def _extract_docx(self, file_path: str) -> Optional[str]:
+    def _extract_docx(self, file_path: str) -> Optional[str]:
         """Extract text from DOCX files"""
         try:
             # Use python-docx for DOCX extraction
@@ -79,7 +84,7 @@ class DocumentProcessor:
             logger.error(f"Failed to extract DOCX {file_path}: {e}")
             return None
     
-    async def _extract_doc(self, file_path: str) -> Optional[str]:
+    def _extract_doc(self, file_path: str) -> Optional[str]:
         """Extract text from DOC files"""
         try:
             # Use python-docx2txt or similar for DOC extraction
@@ -90,7 +95,7 @@ class DocumentProcessor:
             logger.error(f"Failed to extract DOC {file_path}: {e}")
             return None
     
-    async def _extract_xlsx(self, file_path: str) -> Optional[str]:
+    def _extract_xlsx(self, file_path: str) -> Optional[str]:
         """Extract text from XLSX files"""
         try:
             # Use openpyxl or pandas for XLSX extraction
@@ -101,7 +106,7 @@ class DocumentProcessor:
             logger.error(f"Failed to extract XLSX {file_path}: {e}")
             return None
     
-    async def _extract_xls(self, file_path: str) -> Optional[str]:
+    def _extract_xls(self, file_path: str) -> Optional[str]:
         """Extract text from XLS files"""
         try:
             # Use xlrd or pandas for XLS extraction
@@ -112,7 +117,7 @@ class DocumentProcessor:
             logger.error(f"Failed to extract XLS {file_path}: {e}")
             return None
     
-    async def _extract_pptx(self, file_path: str) -> Optional[str]:
+    def _extract_pptx(self, file_path: str) -> Optional[str]:
         """Extract text from PPTX files"""
         try:
             # Use python-pptx for PPTX extraction
@@ -123,7 +128,7 @@ class DocumentProcessor:
             logger.error(f"Failed to extract PPTX {file_path}: {e}")
             return None
     
-    async def _extract_ppt(self, file_path: str) -> Optional[str]:
+    def _extract_ppt(self, file_path: str) -> Optional[str]:
         """Extract text from PPT files"""
         try:
             # Use appropriate library for PPT extraction
@@ -132,4 +137,15 @@ class DocumentProcessor:
             return "PPT content extraction not implemented yet"
         except Exception as e:
             logger.error(f"Failed to extract PPT {file_path}: {e}")
-            return None
\ No newline at end of file
+            return None
+
+_document_processor = DocumentProcessor()
+
+def get_document_processor() -> DocumentProcessor:
+    """Get the shared document processor"""
+    return _document_processor
+
+def extract_text_with_word_count(file_path: str) -> Tuple[Optional[str], int]:
+    """Extract text and count its words; entry point for worker processes"""
+    content = get_document_processor().extract_text(file_path)
+    return content, word_count(content)
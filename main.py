@@ -1,66 +1,93 @@
-from fastapi import FastAPI, HTTPException, Depends, UploadFile, File, Form
+from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from fastapi.responses import JSONResponse
 import uvicorn
 import os
 from dotenv import load_dotenv
-from typing import List, Optional
 import asyncio
+import time
+from contextlib import asynccontextmanager
 from datetime import datetime
 
 from app.core.config import settings
 from app.api.routes import auth, projects, documents, memory, calendar, reminders, search
 from app.core.database import MongoDB
 from app.core.memory_store import MemoryStore
+from app.core.clock import RequestClockMiddleware
+from app.core.responses import AppJSONResponse
+from app.services.apple_integration import get_apple_calendar_service, get_apple_reminders_service
 
 load_dotenv()
 
-app = FastAPI(
-    title="AI Second Brain",
-    description="An intelligent personal assistant that manages documents, projects, and integrates with Apple ecosystem",
-    version="1.0.0"
-)
-
-# CORS middleware
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],  # Configure this for production
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
-
-# Initialize databases
-@app.on_event("startup")
-async def startup_event():
-    """Initialize database connections and services"""
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Initialize database connections and services, and clean them up on shutdown"""
     print("🚀 Starting AI Second Brain application...")
     
-    # Try to initialize MongoDB
+    # Start password hashing workers before any database threads exist
     try:
-        await MongoDB.connect()
-        print("✅ MongoDB connected successfully")
+        await auth.warm_password_pool()
+        print("✅ Password hashing pool ready")
     except Exception as e:
-        print(f"⚠️ MongoDB connection failed: {e}")
-        print("ℹ️ Application will continue without MongoDB (some features may not work)")
+        print(f"⚠️ Password hashing pool warm-up failed: {e}")
     
-    # Try to initialize Memory Store
+    # Same for the document processing workers; forking after Motor starts its threads is unsafe
     try:
-        await MemoryStore.initialize()
-        print("✅ Memory Store initialized successfully")
+        await documents.warm_processing_pool()
+        print("✅ Document processing pool ready")
     except Exception as e:
-        print(f"⚠️ Memory Store initialization failed: {e}")
+        print(f"⚠️ Document processing pool warm-up failed: {e}")
+    
+    # MongoDB and the Memory Store don't depend on each other, so bring them up together
+    mongo_result, memory_result = await asyncio.gather(
+        MongoDB.connect(), MemoryStore.initialize(), return_exceptions=True
+    )
+    
+    if isinstance(mongo_result, Exception):
+        print(f"⚠️ MongoDB connection failed: {mongo_result}")
+        print("ℹ️ Application will continue without MongoDB (some features may not work)")
+    else:
+        print("✅ MongoDB connected successfully")
+    
+    if isinstance(memory_result, Exception):
+        print(f"⚠️ Memory Store initialization failed: {memory_result}")
         print("ℹ️ Application will continue without Memory Store (some features may not work)")
+    else:
+        print("✅ Memory Store initialized successfully")
     
     print("✅ Application startup complete")
-
-@app.on_event("shutdown")
-async def shutdown_event():
-    """Clean up database connections"""
+    
+    yield
+    
+    # Clean up database connections
     await MongoDB.disconnect()
+    auth.shutdown_password_pool()
+    documents.shutdown_processing_pool()
+    MemoryStore.shutdown()
+    await get_apple_calendar_service().close()
+    await get_apple_reminders_service().close()
     print("✅ Application shutdown complete")
 
+app = FastAPI(
+    title="AI Second Brain",
+    description="An intelligent personal assistant that manages documents, projects, and integrates with Apple ecosystem",
+    version="1.0.0",
+    default_response_class=AppJSONResponse,
+    lifespan=lifespan
+)
+
+# One timestamp per request for model defaults
+app.add_middleware(RequestClockMiddleware)
+
+# CORS middleware
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=settings.cors_origins,
+    allow_credentials=True,
+    allow_methods=["GET", "POST", "PUT", "DELETE", "PATCH"],
+    allow_headers=["Authorization", "Content-Type"],
+    max_age=settings.cors_max_age,
+)
+
 # Include routers
 app.include_router(auth.router, prefix="/api/auth", tags=["Authentication"])
 app.include_router(projects.router, prefix="/api/projects", tags=["Projects"])
@@ -70,6 +97,24 @@ app.include_router(calendar.router, prefix="/api/calendar", tags=["Calendar"])
 app.include_router(reminders.router, prefix="/api/reminders", tags=["Reminders"])
 app.include_router(search.router, prefix="/api/search", tags=["Search"])
 
+# Last MongoDB ping as (monotonic time, status); monitors poll /health far more often than this
+HEALTH_PING_TTL = 5.0
+_last_ping = (0.0, "unknown")
+
+async def _cached_mongo_ping() -> str:
+    """Ping MongoDB at most once per HEALTH_PING_TTL seconds"""
+    global _last_ping
+    now = time.monotonic()
+    if now - _last_ping[0] < HEALTH_PING_TTL:
+        return _last_ping[1]
+    try:
+        await MongoDB.client.admin.command('ping')
+        mongo_status = "connected"
+    except:
+        mongo_status = "disconnected"
+    _last_ping = (now, mongo_status)
+    return mongo_status
+
 @app.get("/")
 async def root():
     return {
@@ -85,17 +130,13 @@ async def health_check():
         # Basic health check
         health_status = {
             "status": "healthy",
-            "timestamp": datetime.utcnow().isoformat()
+            "timestamp": datetime.utcnow().isoformat(),
             "version": "1.0.0"
         }
         
         # Check MongoDB if available
         if MongoDB.client:
-            try:
-                await MongoDB.client.admin.command('ping')
-                health_status["mongodb"] = "connected"
-            except:
-                health_status["mongodb"] = "disconnected"
+            health_status["mongodb"] = await _cached_mongo_ping()
         else:
             health_status["mongodb"] = "not_configured"
             
@@ -113,5 +154,7 @@ if __name__ == "__main__":
         "main:app",
         host="0.0.0.0",
         port=int(os.getenv("PORT", 8000)),
+        loop="uvloop",
+        http="httptools",
         reload=True if os.getenv("ENVIRONMENT") == "development" else False
     )
\ No newline at end of file
@@ -0,0 +1,37 @@
+import asyncio
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from bson import ObjectId
+
+from app.core.database import MongoDB
+from app.core.memory_store import MemoryStore
+from app.core.search_versions import search_version
+
+def _fake_collection():
+    collection = MagicMock()
+    collection.insert_one = AsyncMock(return_value=MagicMock(inserted_id=ObjectId()))
+    collection.insert_many = AsyncMock()
+    collection.bulk_write = AsyncMock()
+    return collection
+
+def test_add_memory_stores_memory_and_invalidates_search():
+    collections = {}
+    
+    def get_collection(name):
+        return collections.setdefault(name, _fake_collection())
+    
+    with patch.object(MongoDB, "get_collection", side_effect=get_collection):
+        before = search_version("user-1")
+        result = asyncio.run(MemoryStore.add_memory(
+            user_id="user-1",
+            content="Met Jane Smith at Acme Inc. in Denver",
+            metadata={"source": "test"}
+        ))
+    
+    memory_doc = collections["memories"].insert_one.await_args.args[0]
+    assert memory_doc["user_id"] == "user-1"
+    assert memory_doc["metadata"] == {"source": "test"}
+    assert result["id"] == str(collections["memories"].insert_one.return_value.inserted_id)
+    assert result["entities"]
+    collections["entity_knowledge"].bulk_write.assert_awaited_once()
+    assert search_version("user-1") == before + 1